@@ -9,9 +9,9 @@ welche API verfügbar ist (basierend auf `secrets.env`) und entsprechend
 die Methode `chat_completion()` aufruft.
 """
 
-from .llm_client import LLMClient
+from .llm_client import LLMClient, PoolConfig, SemanticCache
 
-__all__ = ["LLMClient"]
+__all__ = ["LLMClient", "PoolConfig", "SemanticCache"]
 
 # Optionaler Import des Adapters
 try:
@@ -3,9 +3,10 @@
 Dieser Adapter ermöglicht die Nutzung von LLMClient als llama-index LLM.
 """
 
+from collections.abc import Generator, Sequence
 from typing import Any
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from .llm_client import LLMClient
 
@@ -29,6 +30,20 @@ except ImportError:
     LLMMetadata = dict  # type: ignore
 
 
+def _to_dicts(messages: Sequence[ChatMessage]) -> list[dict[str, str]]:
+    """Konvertiert llama_index Nachrichten in das Dict-Format des LLMClient.
+
+    Nachrichten, die bereits Dicts sind, werden unverändert übernommen.
+
+    Args:
+        messages: Liste von ChatMessage-Objekten oder Dicts.
+
+    Returns:
+        Liste von Dicts mit 'role' und 'content' Keys.
+    """
+    return [m if isinstance(m, dict) else {"role": m.role, "content": m.content} for m in messages]
+
+
 class LLMClientAdapter(LLM):
     """Adapter für llama-index zur Nutzung des LLMClient.
 
@@ -53,6 +68,9 @@ class LLMClientAdapter(LLM):
 
     client: LLMClient | None = Field(default=None, exclude=True)
 
+    # Gecachte Metadaten, werden nur bei Modellwechsel des Clients neu erstellt
+    _metadata: LLMMetadata | None = PrivateAttr(default=None)
+
     def __init__(self, **data: Any) -> None:
         """Initialisiert den LLMClientAdapter.
 
@@ -95,7 +113,7 @@ class LLMClientAdapter(LLM):
             raise ValueError("LLMClient instance must be provided")
 
         # Konvertiere llama_index Nachrichten in dict
-        hf_messages = [{"role": m.role, "content": m.content} for m in messages]
+        hf_messages = _to_dicts(messages)
 
         # Nutze LLMClient
         response = self.client.chat_completion(hf_messages)
@@ -117,17 +135,39 @@ class LLMClientAdapter(LLM):
         """
         raise NotImplementedError("complete not implemented")
 
-    def stream_chat(self, *args: Any, **kwargs: Any) -> Any:
-        """Streaming Chat ist nicht implementiert.
+    def stream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> Generator[ChatResponse, None, None]:
+        """Führt einen Chat-Completion Request mit Streaming aus.
 
         Args:
-            *args: Positionsargumente.
-            **kwargs: Keyword-Argumente.
+            messages: Liste von ChatMessage-Objekten von llama-index.
+            **kwargs: Zusätzliche Keyword-Argumente (werden ignoriert).
+
+        Yields:
+            ChatResponse-Objekte mit dem bisher generierten Text in `message`
+            und dem neuen Teilstück in `delta`.
 
         Raises:
-            NotImplementedError: Diese Methode ist nicht implementiert.
+            ValueError: Wenn kein Client gesetzt ist.
+
+        Examples:
+            >>> messages = [ChatMessage(role="user", content="Hello!")]
+            >>> for response in adapter.stream_chat(messages):
+            ...     print(response.delta, end="")
         """
-        raise NotImplementedError("stream_chat not implemented")
+        if self.client is None:
+            raise ValueError("LLMClient instance must be provided")
+
+        hf_messages = _to_dicts(messages)
+
+        content = ""
+        for delta in self.client.chat_completion_stream(hf_messages):
+            content += delta
+            yield ChatResponse(
+                message=ChatMessage(role="assistant", content=content),
+                delta=delta,
+            )
 
     def stream_complete(self, *args: Any, **kwargs: Any) -> Any:
         """Streaming Completion ist nicht implementiert.
@@ -165,17 +205,34 @@ class LLMClientAdapter(LLM):
         """
         raise NotImplementedError("astream_complete not implemented")
 
-    async def achat(self, *args: Any, **kwargs: Any) -> Any:
-        """Async Chat ist nicht implementiert.
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        """Führt einen Chat-Completion Request asynchron aus.
+
+        Gleichzeitige identische Requests werden vom LLMClient zu einem
+        API-Aufruf zusammengefasst.
 
         Args:
-            *args: Positionsargumente.
-            **kwargs: Keyword-Argumente.
+            messages: Liste von ChatMessage-Objekten von llama-index.
+            **kwargs: Zusätzliche Keyword-Argumente (werden ignoriert).
+
+        Returns:
+            ChatResponse-Objekt mit der generierten Antwort.
 
         Raises:
-            NotImplementedError: Diese Methode ist nicht implementiert.
+            ValueError: Wenn kein Client gesetzt ist.
+
+        Examples:
+            >>> messages = [ChatMessage(role="user", content="Hello!")]
+            >>> response = await adapter.achat(messages)
         """
-        raise NotImplementedError("achat not implemented")
+        if self.client is None:
+            raise ValueError("LLMClient instance must be provided")
+
+        hf_messages = _to_dicts(messages)
+
+        response = await self.client.achat_completion(hf_messages)
+
+        return ChatResponse(message=ChatMessage(role="assistant", content=response))
 
     async def acomplete(self, *args: Any, **kwargs: Any) -> Any:
         """Async Completion ist nicht implementiert.
@@ -207,21 +264,25 @@ class LLMClientAdapter(LLM):
     def metadata(self) -> LLMMetadata:
         """Gibt Metadaten über das LLM zurück.
 
+        Das LLMMetadata-Objekt wird gecacht und nur neu erstellt, wenn sich
+        das Modell des Clients geändert hat.
+
         Returns:
             LLMMetadata-Objekt mit Modell-Informationen.
 
         Raises:
             ValueError: Wenn kein Client gesetzt ist.
         """
-        if self.client is None:
-            raise ValueError("LLMClient instance must be provided")
-
-        return LLMMetadata(
-            context_window=2048,
-            num_output=512,
-            is_chat_model=True,
-            model_name=self.model,
-        )
+        model_name = self.model
+
+        if self._metadata is None or self._metadata.model_name != model_name:
+            self._metadata = LLMMetadata(
+                context_window=2048,
+                num_output=512,
+                is_chat_model=True,
+                model_name=model_name,
+            )
+        return self._metadata
 
     def __repr__(self) -> str:
         """String-Repräsentation des Adapters.
@@ -1,25 +1,319 @@
 """LLM Client Module für universelle LLM-API Zugriffe."""
 
+import asyncio
+import functools
+import hashlib
+import importlib.util
 import os
-from typing import Any, Literal
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Literal, cast
 
+import orjson
 from dotenv import load_dotenv
 
-# Optionale Imports – falls nicht installiert, wird das erkannt
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None  # type: ignore
+_VALID_API_CHOICES = frozenset(("openai", "groq", "ollama"))
 
-try:
-    from groq import Groq
-except ImportError:
-    Groq = None  # type: ignore
+# Die SDKs von OpenAI, Groq und Ollama werden erst importiert, wenn die
+# jeweilige API genutzt wird – das spart Importzeit und Speicher.
 
-try:
-    import ollama
-except ImportError:
-    ollama = None  # type: ignore
+
+@functools.cache
+def _load_secrets(secrets_path: str) -> tuple[str | None, str | None]:
+    """Lädt die API-Keys einmalig pro secrets-Pfad.
+
+    Liest zuerst `secrets_path` (falls vorhanden) und die Umgebungsvariablen,
+    in Google Colab zusätzlich `userdata`. Das Ergebnis wird gecacht, da
+    `userdata.get` in Colab ein vergleichsweise langsamer IPC-Aufruf ist.
+
+    Args:
+        secrets_path: Pfad zur secrets.env-Datei.
+
+    Returns:
+        Tupel aus OpenAI- und Groq-API-Key (jeweils None, falls nicht vorhanden).
+    """
+    if os.path.exists(secrets_path):
+        load_dotenv(secrets_path)
+
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    groq_api_key = os.getenv("GROQ_API_KEY")
+
+    # Fallback für Google Colab
+    if openai_api_key is None or groq_api_key is None:
+        try:
+            if "google.colab" in sys.modules or "COLAB_GPU" in os.environ:
+                # Google Colab erkannt
+                from google.colab import userdata
+
+                if openai_api_key is None:
+                    openai_api_key = userdata.get("OPENAI_API_KEY")
+                if groq_api_key is None:
+                    groq_api_key = userdata.get("GROQ_API_KEY")
+        except ImportError:
+            # Nicht auf Colab oder userdata nicht verfügbar
+            pass
+
+    return openai_api_key, groq_api_key
+
+
+def _import_sdk_client(api_choice: str) -> Any | None:
+    """Importiert die Client-Klasse des OpenAI- oder Groq-SDKs.
+
+    Args:
+        api_choice: 'openai' oder 'groq'.
+
+    Returns:
+        Die Klasse `OpenAI` bzw. `Groq` oder None, wenn das SDK nicht installiert ist.
+    """
+    try:
+        if api_choice == "openai":
+            from openai import OpenAI
+
+            return OpenAI
+
+        from groq import Groq
+
+        return Groq
+    except ImportError:
+        return None
+
+
+def _import_ollama() -> Any | None:
+    """Importiert das Ollama-Package.
+
+    Returns:
+        Das Modul `ollama` oder None, wenn es nicht installiert ist.
+    """
+    try:
+        import ollama
+    except ImportError:
+        return None
+    return ollama
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Konfiguration des HTTP-Verbindungspools für OpenAI- und Groq-Clients.
+
+    Clients mit gleicher API, gleichem API-Key und gleicher PoolConfig teilen
+    sich einen SDK-Client und damit dessen TCP/TLS-Verbindungen.
+
+    Attributes:
+        max_connections: Maximale Anzahl gleichzeitiger Verbindungen.
+        max_keepalive_connections: Maximale Anzahl offen gehaltener Verbindungen.
+        idle_timeout: Sekunden, nach denen ungenutzte Verbindungen geschlossen werden.
+        http2: HTTP/2 verwenden, sodass parallele Requests sich eine Verbindung
+            teilen. Wird ignoriert, wenn das Paket `h2` nicht installiert ist.
+        timeout: Timeout in Sekunden für einen Request.
+        connect_timeout: Timeout in Sekunden für den Verbindungsaufbau.
+
+    Examples:
+        >>> client = LLMClient(pool_config=PoolConfig(max_keepalive_connections=8))
+    """
+
+    max_connections: int = 128
+    max_keepalive_connections: int = 64
+    idle_timeout: float = 300.0
+    http2: bool = True
+    timeout: float = 60.0
+    connect_timeout: float = 5.0
+
+    def create_http_client(self) -> Any:
+        """Erstellt einen httpx-Client mit den konfigurierten Limits.
+
+        Returns:
+            Neue `httpx.Client`-Instanz.
+        """
+        import httpx
+
+        return httpx.Client(
+            http2=self.http2 and importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.idle_timeout,
+            ),
+            follow_redirects=True,
+        )
+
+
+# Geteilte SDK-Clients, Schlüssel: (api_choice, api_key, pool_config)
+_CLIENT_POOL: dict[tuple[str, str, PoolConfig], Any] = {}
+_CLIENT_POOL_LOCK = threading.Lock()
+
+
+def _get_pooled_client(api_choice: str, api_key: str | None, pool_config: PoolConfig) -> Any:
+    """Liefert einen geteilten OpenAI- oder Groq-Client aus dem Pool.
+
+    Args:
+        api_choice: 'openai' oder 'groq'.
+        api_key: API-Key für den Client.
+        pool_config: Konfiguration des HTTP-Verbindungspools.
+
+    Returns:
+        Der SDK-Client oder None, wenn das SDK nicht installiert ist.
+    """
+    factory = _import_sdk_client(api_choice)
+    if factory is None:
+        return None
+
+    key = (api_choice, api_key or "", pool_config)
+    with _CLIENT_POOL_LOCK:
+        client = _CLIENT_POOL.get(key)
+        if client is None:
+            client = factory(api_key=api_key, http_client=pool_config.create_http_client())
+            _CLIENT_POOL[key] = client
+    return client
+
+
+class SemanticCache:
+    """Semantischer Antwort-Cache auf Basis von Satz-Embeddings.
+
+    Findet gespeicherte Antworten auch für umformulierte Prompts, z.B.
+    "Explain AI." und "Can you explain AI?". Eingebettet wird nur die letzte
+    Nutzer-Nachricht; der restliche Verlauf (inkl. System-Prompt), Modell und
+    max_tokens bilden einen Hash, der als Namensraum dient. Treffer werden so
+    nur innerhalb desselben Kontexts geliefert.
+
+    Benötigt die optionalen Pakete `sentence-transformers` und `faiss-cpu`,
+    die erst bei der ersten Nutzung importiert werden. Ob faiss installiert
+    ist, wird bereits beim Erstellen geprüft, damit keine bezahlte Antwort
+    verloren geht, weil sie anschließend nicht gespeichert werden kann.
+
+    Attributes:
+        threshold: Minimale Kosinus-Ähnlichkeit für einen Treffer.
+        model_name: Name des sentence-transformers Modells.
+        max_temperature: Requests mit höherer Temperatur werden nicht gecacht.
+
+    Examples:
+        >>> cache = SemanticCache(threshold=0.9)
+        >>> client = LLMClient(temperature=0.0, semantic_cache=cache)
+    """
+
+    def __init__(
+        self,
+        threshold: float | None = None,
+        model_name: str = "all-MiniLM-L6-v2",
+        max_temperature: float = 0.3,
+        encoder: Any | None = None,
+    ) -> None:
+        """Initialisiert den semantischen Cache.
+
+        Args:
+            threshold: Minimale Kosinus-Ähnlichkeit für einen Treffer. Wenn None,
+                wird `LLM_CLIENT_SEMANTIC_THRESHOLD` gelesen, sonst 0.92.
+            model_name: sentence-transformers Modell für die Embeddings.
+                Standard: "all-MiniLM-L6-v2".
+            max_temperature: Maximale Sampling-Temperatur, bis zu der gecacht
+                wird. Standard: 0.3.
+            encoder: Optionales Objekt mit `encode()`-Methode, das statt eines
+                sentence-transformers Modells verwendet wird.
+
+        Raises:
+            ImportError: Wenn faiss nicht installiert ist.
+        """
+        if importlib.util.find_spec("faiss") is None:
+            raise ImportError(
+                "faiss is required to use SemanticCache. Install it with: pip install faiss-cpu"
+            )
+        if threshold is None:
+            threshold = float(os.getenv("LLM_CLIENT_SEMANTIC_THRESHOLD", "0.92"))
+        self.threshold: float = threshold
+        self.model_name: str = model_name
+        self.max_temperature: float = max_temperature
+        self._encoder: Any | None = encoder
+        # Namensraum -> (faiss-Index, Antworten in Index-Reihenfolge)
+        self._indexes: dict[str, tuple[Any, list[str]]] = {}
+        # faiss erlaubt kein add() parallel zu search(); Index und Antwortliste
+        # müssen zudem gemeinsam aktualisiert werden
+        self._lock = threading.Lock()
+
+    def encode(self, text: str) -> Any:
+        """Berechnet das L2-normalisierte Embedding eines Textes.
+
+        Args:
+            text: Der einzubettende Text.
+
+        Returns:
+            float32-Array der Form (1, dim).
+
+        Raises:
+            ImportError: Wenn sentence-transformers nicht installiert ist.
+        """
+        import numpy as np
+
+        if self._encoder is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise ImportError(
+                    "sentence-transformers is required to use SemanticCache. "
+                    "Install it with: pip install sentence-transformers faiss-cpu"
+                ) from e
+            self._encoder = SentenceTransformer(self.model_name)
+
+        vec = self._encoder.encode(text, normalize_embeddings=True)
+        return np.asarray(vec, dtype="float32").reshape(1, -1)
+
+    def lookup(self, namespace: str, vec: Any) -> str | None:
+        """Sucht die ähnlichste gespeicherte Antwort im Namensraum.
+
+        Args:
+            namespace: Hash des Request-Kontexts.
+            vec: Embedding aus `encode()`.
+
+        Returns:
+            Die gespeicherte Antwort, falls die Ähnlichkeit >= threshold ist,
+            sonst None.
+        """
+        with self._lock:
+            entry = self._indexes.get(namespace)
+            if entry is None:
+                return None
+
+            index, responses = entry
+            scores, ids = index.search(vec, 1)
+            best = int(ids[0][0])
+            if best >= 0 and scores[0][0] >= self.threshold:
+                return responses[best]
+            return None
+
+    def add(self, namespace: str, vec: Any, response: str) -> None:
+        """Speichert eine Antwort zum Embedding im Namensraum.
+
+        Args:
+            namespace: Hash des Request-Kontexts.
+            vec: Embedding aus `encode()`.
+            response: Die zu speichernde Antwort.
+        """
+        with self._lock:
+            if namespace not in self._indexes:
+                import faiss
+
+                self._indexes[namespace] = (faiss.IndexFlatIP(vec.shape[1]), [])
+
+            index, responses = self._indexes[namespace]
+            index.add(vec)
+            responses.append(response)
+
+    def clear(self) -> None:
+        """Entfernt alle gespeicherten Einträge."""
+        with self._lock:
+            self._indexes.clear()
+
+    def __len__(self) -> int:
+        """Gibt die Anzahl der gespeicherten Antworten zurück.
+
+        Returns:
+            Anzahl der Einträge über alle Namensräume.
+        """
+        with self._lock:
+            return sum(len(responses) for _, responses in self._indexes.values())
 
 
 class LLMClient:
@@ -37,6 +331,8 @@ class LLMClient:
         client: Instanz des gewählten API-Clients.
         openai_api_key: OpenAI API Key (falls vorhanden).
         groq_api_key: Groq API Key (falls vorhanden).
+        cache_hits: Anzahl der Antworten, die aus dem Cache kamen.
+        cache_misses: Anzahl der Cache-Fehlschläge mit anschließendem API-Aufruf.
 
     Examples:
         >>> # Automatische API-Auswahl basierend auf verfügbaren Keys
@@ -56,6 +352,14 @@ class LLMClient:
         api_choice: Literal["openai", "groq", "ollama"] | None = None,
         secrets_path: str = "secrets.env",
         keep_alive: str = "5m",
+        cache_size: int = 128,
+        cache_nondeterministic: bool = False,
+        cache_dir: str | None = None,
+        semantic_cache: SemanticCache | None = None,
+        pool_config: PoolConfig | None = None,
+        history_strategy: Literal["none", "window", "summarize"] = "none",
+        max_input_tokens: int = 3072,
+        stable_context: bool = False,
     ) -> None:
         """Initialisiert den LLM Client.
 
@@ -67,55 +371,50 @@ class LLMClient:
                 Wenn None, wird automatisch gewählt.
             secrets_path: Pfad zur secrets.env-Datei. Standard: "secrets.env".
             keep_alive: Ollama-Parameter für Modell-Caching. Standard: "5m".
+            cache_size: Maximale Anzahl der im Speicher gecachten Antworten
+                (LRU). 0 deaktiviert den In-Memory-Cache. Standard: 128.
+            cache_nondeterministic: Wenn True, werden auch Antworten mit
+                temperature > 0 gecacht. Standard: False.
+            cache_dir: Optionales Verzeichnis für einen persistenten
+                Antwort-Cache (benötigt `diskcache`). Standard: None.
+            semantic_cache: Optionaler `SemanticCache`, der nach einem
+                Fehlschlag im exakten Cache ähnliche Prompts nachschlägt.
+                Standard: None.
+            pool_config: Konfiguration des geteilten HTTP-Verbindungspools
+                für OpenAI und Groq. Wenn None, wird PoolConfig() verwendet.
+            history_strategy: Umgang mit langen Verläufen, die `max_input_tokens`
+                überschreiten: "none" sendet alles, "window" behält System-Prompt
+                und die neuesten Nachrichten, "summarize" ersetzt die verworfenen
+                Nachrichten zusätzlich durch eine Zusammenfassung. Standard: "none".
+            max_input_tokens: Token-Budget für den gesendeten Verlauf. Standard: 3072.
+            stable_context: Wenn True, werden Nachrichten mit role "context"
+                (z.B. RAG-Treffer) sortiert und mit den System-Nachrichten zu
+                einer führenden System-Nachricht zusammengefasst. Der Prompt-
+                Anfang ist so über Requests hinweg byte-identisch und kann vom
+                Prefix-Cache des Providers wiederverwendet werden. Standard: False.
 
         Raises:
-            ValueError: Wenn api_choice einen ungültigen Wert hat.
+            ValueError: Wenn api_choice oder history_strategy einen ungültigen Wert hat.
+            ImportError: Wenn cache_dir gesetzt, aber diskcache nicht installiert ist.
 
         Examples:
             >>> client = LLMClient(llm="gpt-4o", temperature=0.5)
             >>> client = LLMClient(api_choice="ollama", max_tokens=1024)
         """
-        # 1. Lade secrets.env, falls vorhanden
-        if os.path.exists(secrets_path):
-            load_dotenv(secrets_path)
+        # 1. API-Keys aus secrets.env, Umgebung bzw. Google Colab (gecacht pro Pfad)
+        self.openai_api_key: str | None
+        self.groq_api_key: str | None
+        self.openai_api_key, self.groq_api_key = _load_secrets(secrets_path)
 
-        self.openai_api_key: str | None = os.getenv("OPENAI_API_KEY")
-        self.groq_api_key: str | None = os.getenv("GROQ_API_KEY")
-
-        # 2. Fallback für Google Colab
-        if self.openai_api_key is None or self.groq_api_key is None:
-            try:
-                import sys
-
-                if "google.colab" in sys.modules or "COLAB_GPU" in os.environ:
-                    # Google Colab erkannt
-                    from google.colab import userdata
-
-                    if self.openai_api_key is None:
-                        self.openai_api_key = userdata.get("OPENAI_API_KEY")
-                    if self.groq_api_key is None:
-                        self.groq_api_key = userdata.get("GROQ_API_KEY")
-            except ImportError:
-                # Nicht auf Colab oder userdata nicht verfügbar
-                pass
-
-        # 3. Automatische API-Auswahl
-        if api_choice is None:
-            if self.openai_api_key:
-                self.api_choice: str = "openai"
-            elif self.groq_api_key:
-                self.api_choice = "groq"
-            else:
-                self.api_choice = "ollama"
-        else:
-            valid_choices = {"openai", "groq", "ollama"}
-            if api_choice.lower() not in valid_choices:
-                raise ValueError(
-                    f"Invalid api_choice: {api_choice}. " f"Must be one of {valid_choices}"
-                )
-            self.api_choice = api_choice.lower()
+        # 2. API-Auswahl (explizit oder automatisch)
+        normalized = api_choice.lower() if api_choice else None
+        if normalized is not None and normalized not in _VALID_API_CHOICES:
+            raise ValueError(
+                f"Invalid api_choice: {api_choice}. Must be one of {sorted(_VALID_API_CHOICES)}"
+            )
+        self.api_choice: str = normalized or self._auto_detect()
 
-        # 4. Default-Modellauswahl
+        # 3. Default-Modellauswahl
         if llm:
             self.llm: str = llm
         else:
@@ -130,27 +429,98 @@ class LLMClient:
         self.max_tokens: int = max_tokens
         self.keep_alive: str = keep_alive
 
-        # 5. Clients vorbereiten
+        # 4. Clients vorbereiten
+        pool_config = pool_config or PoolConfig()
         self.client: Any | None = None
-        if self.api_choice == "openai" and OpenAI:
-            self.client = OpenAI(api_key=self.openai_api_key)
-        elif self.api_choice == "groq" and Groq:
-            self.client = Groq(api_key=self.groq_api_key)
+        if self.api_choice == "openai":
+            self.client = _get_pooled_client("openai", self.openai_api_key, pool_config)
+        elif self.api_choice == "groq":
+            self.client = _get_pooled_client("groq", self.groq_api_key, pool_config)
+
+        # 5. Antwort-Cache vorbereiten
+        self.cache_size: int = cache_size
+        self.cache_nondeterministic: bool = cache_nondeterministic
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        # Schützt LRU-Cache und Zähler, da achat_completion in Worker-Threads läuft
+        self._cache_lock = threading.Lock()
+        self._disk_cache: Any | None = None
+        if cache_dir is not None:
+            try:
+                import diskcache
+            except ImportError as e:
+                raise ImportError(
+                    "diskcache is required to use cache_dir. "
+                    "Install it with: pip install diskcache"
+                ) from e
+            self._disk_cache = diskcache.Cache(cache_dir)
+        self.semantic_cache: SemanticCache | None = semantic_cache
+
+        # 6. Laufende Requests für die Deduplizierung identischer Anfragen
+        self._inflight: dict[str, asyncio.Task[str]] = {}
+        self._inflight_threads: dict[str, Future[str]] = {}
+        self._inflight_lock = threading.Lock()
 
-    def chat_completion(self, messages: list[dict[str, str]]) -> str:
+        # 7. Aufbereitung der Nachrichten
+        if history_strategy not in ("none", "window", "summarize"):
+            raise ValueError(
+                f"Invalid history_strategy: {history_strategy}. "
+                "Must be one of {'none', 'window', 'summarize'}"
+            )
+        self.history_strategy: str = history_strategy
+        self.max_input_tokens: int = max_input_tokens
+        self._encoding: Any | None = None
+        self._encoding_unavailable: bool = False
+        self.stable_context: bool = stable_context
+
+        # 8. Backends einmalig festlegen, statt api_choice bei jedem Aufruf zu prüfen
+        self._chat_backend = {
+            "openai": self._chat_sdk,
+            "groq": self._chat_sdk,
+            "ollama": self._chat_ollama,
+        }[self.api_choice]
+        self._stream_backend = {
+            "openai": self._stream_sdk,
+            "groq": self._stream_sdk,
+            "ollama": self._stream_ollama,
+        }[self.api_choice]
+
+    def _auto_detect(self) -> str:
+        """Wählt die API anhand der verfügbaren API-Keys.
+
+        Returns:
+            'openai', falls ein OpenAI-Key vorhanden ist, sonst 'groq', falls ein
+            Groq-Key vorhanden ist, sonst 'ollama'.
+        """
+        if self.openai_api_key:
+            return "openai"
+        if self.groq_api_key:
+            return "groq"
+        return "ollama"
+
+    def chat_completion(self, messages: list[dict[str, str]], stream: bool = False) -> str:
         """Führt eine Chat-Completion mit der gewählten API aus.
 
+        Identische Requests werden aus dem Antwort-Cache beantwortet, sofern
+        dieser aktiv ist (siehe `cache_size` und `cache_nondeterministic`).
+        Laufen identische Requests gleichzeitig in mehreren Threads, wird nur
+        einer an die API gesendet; die übrigen warten auf dessen Ergebnis.
+        Bei temperature > 0 gilt das nur mit `cache_nondeterministic=True`.
+
         Args:
             messages: Liste von Nachrichten im Chat-Format.
                 Jede Nachricht ist ein Dict mit 'role' und 'content' Keys.
                 Beispiel: [{"role": "user", "content": "Hello!"}]
+            stream: Wenn True, wird die Antwort per Streaming abgerufen und
+                die Teilstücke aus `chat_completion_stream()` zusammengefügt.
+                Standard: False.
 
         Returns:
             Der generierte Text als String.
 
         Raises:
             RuntimeError: Wenn der gewählte Client nicht verfügbar ist.
-            ValueError: Wenn api_choice ungültig ist.
 
         Examples:
             >>> client = LLMClient()
@@ -161,51 +531,720 @@ class LLMClient:
             >>> response = client.chat_completion(messages)
             >>> print(response)
         """
-        if self.api_choice == "openai":
-            if not self.client:
-                raise RuntimeError("OpenAI client not available or not installed.")
-            response = self.client.chat.completions.create(
-                model=self.llm,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-            )
-            return response.choices[0].message.content
+        if stream:
+            return "".join(self.chat_completion_stream(messages))
 
-        elif self.api_choice == "groq":
-            if not self.client:
-                raise RuntimeError("Groq client not available or not installed.")
-            response = self.client.chat.completions.create(
-                model=self.llm,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
+        messages = self._canonicalize(messages)
+        key = self._request_key(messages)
+        use_cache = self._cache_enabled()
+        cached = self._cache_get(key) if use_cache else None
+
+        # Embedding erst nach einem exakten Fehlschlag berechnen
+        semantic_query = self._semantic_query(messages) if cached is None else None
+        if not use_cache and semantic_query is None:
+            return self._coalesce(key, messages)
+
+        # Nach einem exakten Fehlschlag nach ähnlichen Prompts suchen
+        if cached is None and semantic_query is not None:
+            cached = self.semantic_cache.lookup(*semantic_query)
+            if cached is not None and use_cache:
+                self._cache_set(key, cached)
+
+        if cached is not None:
+            with self._cache_lock:
+                self.cache_hits += 1
+            return cached
+
+        with self._cache_lock:
+            self.cache_misses += 1
+        response = self._coalesce(key, messages)
+        if use_cache:
+            self._cache_set(key, response)
+        if semantic_query is not None:
+            self.semantic_cache.add(*semantic_query, response)
+        return response
+
+    async def achat_completion(self, messages: list[dict[str, str]]) -> str:
+        """Führt eine Chat-Completion asynchron aus.
+
+        Der blockierende API-Aufruf läuft in einem Worker-Thread. Identische
+        Requests, die gleichzeitig laufen, werden zusammengefasst: nur der
+        erste erreicht die API, alle weiteren warten auf dessen Ergebnis.
+        Wird ein wartender Aufrufer abgebrochen, laufen der API-Aufruf und
+        die übrigen Aufrufer weiter. Bei temperature > 0 wird nur mit
+        `cache_nondeterministic=True` zusammengefasst.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Der generierte Text als String.
+
+        Raises:
+            RuntimeError: Wenn der gewählte Client nicht verfügbar ist.
+
+        Examples:
+            >>> client = LLMClient()
+            >>> messages = [{"role": "user", "content": "Explain AI."}]
+            >>> response = await client.achat_completion(messages)
+        """
+        if not self._responses_reusable():
+            return await asyncio.to_thread(self.chat_completion, messages)
+
+        messages = self._canonicalize(messages)
+        key = self._request_key(messages)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(self.chat_completion, messages))
+            self._inflight[key] = task
+
+            def finished(done: asyncio.Task[str]) -> None:
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+                # Verhindert eine Warnung, falls niemand mehr auf das Ergebnis wartet
+                if not done.cancelled():
+                    done.exception()
+
+            task.add_done_callback(finished)
+
+        # Der Abbruch eines Aufrufers darf den gemeinsamen Request nicht abbrechen
+        return await asyncio.shield(task)
+
+    async def chat_completion_batch(
+        self,
+        batch: list[list[dict[str, str]]],
+        concurrency: int = 8,
+        batch_mode: Literal["concurrent", "async"] = "concurrent",
+        poll_interval: float = 30.0,
+    ) -> list[str]:
+        """Führt mehrere unabhängige Chat-Completions aus.
+
+        Im Modus "concurrent" laufen höchstens `concurrency` Requests
+        gleichzeitig über `achat_completion()`. Im Modus "async" (nur OpenAI)
+        werden alle Requests über die OpenAI Batch API eingereicht. Diese ist
+        um 50 % günstiger, liefert die Ergebnisse aber erst innerhalb von
+        bis zu 24 Stunden.
+
+        Args:
+            batch: Liste von Nachrichten-Listen, eine pro Request.
+            concurrency: Maximale Anzahl gleichzeitiger Requests im Modus
+                "concurrent". Standard: 8.
+            batch_mode: "concurrent" oder "async". Standard: "concurrent".
+            poll_interval: Sekunden zwischen zwei Statusabfragen im Modus
+                "async". Standard: 30.0.
+
+        Returns:
+            Die generierten Texte in der Reihenfolge von `batch`.
+
+        Raises:
+            RuntimeError: Wenn der Client nicht verfügbar ist oder der
+                Batch-Job fehlschlägt.
+            ValueError: Wenn batch_mode ungültig ist, "async" nicht mit
+                OpenAI verwendet wird oder concurrency kleiner als 1 ist.
+
+        Examples:
+            >>> client = LLMClient()
+            >>> batch = [
+            ...     [{"role": "user", "content": "Was ist KI?"}],
+            ...     [{"role": "user", "content": "Was ist ML?"}],
+            ... ]
+            >>> responses = await client.chat_completion_batch(batch, concurrency=4)
+        """
+        if batch_mode == "async":
+            return await self._openai_batch(batch, poll_interval)
+        if batch_mode != "concurrent":
+            raise ValueError(
+                f"Invalid batch_mode: {batch_mode}. Must be one of {{'concurrent', 'async'}}"
             )
-            return response.choices[0].message.content
+        if concurrency < 1:
+            raise ValueError(f"Invalid concurrency: {concurrency}. Must be at least 1")
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(messages: list[dict[str, str]]) -> str:
+            async with semaphore:
+                return await self.achat_completion(messages)
 
-        elif self.api_choice == "ollama":
-            if not ollama:
-                raise RuntimeError(
-                    "Ollama Python package not available. "
-                    "Please install it via `pip install ollama`."
+        return list(await asyncio.gather(*(run(messages) for messages in batch)))
+
+    async def _openai_batch(
+        self, batch: list[list[dict[str, str]]], poll_interval: float
+    ) -> list[str]:
+        """Reicht Requests über die OpenAI Batch API ein und wartet auf das Ergebnis.
+
+        Args:
+            batch: Liste von Nachrichten-Listen, eine pro Request.
+            poll_interval: Sekunden zwischen zwei Statusabfragen.
+
+        Returns:
+            Die generierten Texte in der Reihenfolge von `batch`.
+
+        Raises:
+            RuntimeError: Wenn der Client nicht verfügbar ist oder der
+                Batch-Job fehlschlägt.
+            ValueError: Wenn nicht OpenAI verwendet wird.
+        """
+        if self.api_choice != "openai":
+            raise ValueError("batch_mode='async' is only supported for OpenAI.")
+        if not self.client:
+            raise RuntimeError("OpenAI client not available or not installed.")
+
+        def build_lines() -> list[bytes]:
+            return [
+                orjson.dumps(
+                    {
+                        "custom_id": str(i),
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": {
+                            "model": self.llm,
+                            "messages": self._prepare_messages(messages),
+                            "temperature": self.temperature,
+                            "max_tokens": self.max_tokens,
+                        },
+                    }
                 )
-            response = ollama.chat(
-                model=self.llm,
-                messages=messages,
-                stream=False,
-                options={
-                    "temperature": self.temperature,
-                    "num_predict": self.max_tokens,
-                    "repeat_penalty": 1.2,
-                    "top_k": 10,
-                    "top_p": 0.5,
-                },
-                keep_alive=self.keep_alive,
+                for i, messages in enumerate(batch)
+            ]
+
+        # Mit history_strategy="summarize" kann das Kürzen selbst API-Aufrufe auslösen
+        lines = await asyncio.to_thread(build_lines)
+        input_file = await asyncio.to_thread(
+            self.client.files.create,
+            file=("batch.jsonl", b"\n".join(lines)),
+            purpose="batch",
+        )
+        job = await asyncio.to_thread(
+            self.client.batches.create,
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+
+        while job.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(poll_interval)
+            job = await asyncio.to_thread(self.client.batches.retrieve, job.id)
+
+        if job.status != "completed" or not job.output_file_id:
+            raise RuntimeError(f"OpenAI batch {job.id} finished with status '{job.status}'.")
+
+        output = await asyncio.to_thread(self.client.files.content, job.output_file_id)
+        results: dict[str, str] = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                continue
+            results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+
+        missing = [i for i in range(len(batch)) if str(i) not in results]
+        if missing:
+            raise RuntimeError(
+                f"OpenAI batch {job.id} returned no result for {len(missing)} request(s): "
+                f"{missing}"
             )
-            return response["message"]["content"]
+        return [results[str(i)] for i in range(len(batch))]
+
+    def _coalesce(self, key: str, messages: list[dict[str, str]]) -> str:
+        """Fasst gleichzeitige identische Requests aus mehreren Threads zusammen.
+
+        Args:
+            key: Request-Schlüssel aus `_request_key()`.
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Der generierte Text als String.
+        """
+        if not self._responses_reusable():
+            return self._create_chat_completion(messages)
+
+        with self._inflight_lock:
+            pending = self._inflight_threads.get(key)
+            if pending is None:
+                future: Future[str] = Future()
+                self._inflight_threads[key] = future
 
+        if pending is not None:
+            return pending.result()
+
+        try:
+            response = self._create_chat_completion(messages)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
         else:
-            raise ValueError(f"Unsupported API choice: {self.api_choice}")
+            future.set_result(response)
+            return response
+        finally:
+            with self._inflight_lock:
+                self._inflight_threads.pop(key, None)
+
+    def _create_chat_completion(self, messages: list[dict[str, str]]) -> str:
+        """Sendet den Chat-Completion Request ohne Cache an die gewählte API.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Der generierte Text als String.
+
+        Raises:
+            RuntimeError: Wenn der gewählte Client nicht verfügbar ist.
+        """
+        return self._chat_backend(self._truncate_messages(messages))
+
+    def _chat_sdk(self, messages: list[dict[str, str]]) -> str:
+        """Führt eine Chat-Completion über das OpenAI- bzw. Groq-SDK aus.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Der generierte Text als String.
+
+        Raises:
+            RuntimeError: Wenn der SDK-Client nicht verfügbar ist.
+        """
+        response = self._require_client().chat.completions.create(
+            model=self.llm,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+        )
+        return response.choices[0].message.content
+
+    def _chat_ollama(self, messages: list[dict[str, str]]) -> str:
+        """Führt eine Chat-Completion über Ollama aus.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Der generierte Text als String.
+
+        Raises:
+            RuntimeError: Wenn das Ollama-Package nicht installiert ist.
+        """
+        response = self._require_ollama().chat(
+            model=self.llm,
+            messages=messages,
+            stream=False,
+            options=self._ollama_options(),
+            keep_alive=self.keep_alive,
+        )
+        return response["message"]["content"]
+
+    def chat_completion_stream(self, messages: list[dict[str, str]]) -> Iterator[str]:
+        """Führt eine Chat-Completion aus und liefert die Antwort stückweise.
+
+        Die Token-Deltas werden geliefert, sobald die API sie sendet. Dadurch
+        kann der Aufrufer mit der Verarbeitung beginnen, bevor die vollständige
+        Antwort generiert wurde.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+                Jede Nachricht ist ein Dict mit 'role' und 'content' Keys.
+
+        Yields:
+            Die generierten Text-Teilstücke als Strings.
+
+        Raises:
+            RuntimeError: Wenn der gewählte Client nicht verfügbar ist.
+
+        Examples:
+            >>> client = LLMClient()
+            >>> messages = [{"role": "user", "content": "Explain AI."}]
+            >>> for delta in client.chat_completion_stream(messages):
+            ...     print(delta, end="", flush=True)
+        """
+        yield from self._stream_backend(self._prepare_messages(messages))
+
+    def _stream_sdk(self, messages: list[dict[str, str]]) -> Iterator[str]:
+        """Streamt eine Chat-Completion über das OpenAI- bzw. Groq-SDK.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Yields:
+            Die generierten Text-Teilstücke als Strings.
+
+        Raises:
+            RuntimeError: Wenn der SDK-Client nicht verfügbar ist.
+        """
+        response = self._require_client().chat.completions.create(
+            model=self.llm,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+        )
+        for chunk in response:
+            # Der letzte Chunk kann ohne choices kommen (z.B. Usage-Infos)
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    def _stream_ollama(self, messages: list[dict[str, str]]) -> Iterator[str]:
+        """Streamt eine Chat-Completion über Ollama.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Yields:
+            Die generierten Text-Teilstücke als Strings.
+
+        Raises:
+            RuntimeError: Wenn das Ollama-Package nicht installiert ist.
+        """
+        response = self._require_ollama().chat(
+            model=self.llm,
+            messages=messages,
+            stream=True,
+            options=self._ollama_options(),
+            keep_alive=self.keep_alive,
+        )
+        for chunk in response:
+            yield chunk["message"]["content"]
+
+    def _require_client(self) -> Any:
+        """Liefert den OpenAI- bzw. Groq-Client.
+
+        Returns:
+            Der SDK-Client.
+
+        Raises:
+            RuntimeError: Wenn der SDK-Client nicht verfügbar ist.
+        """
+        if not self.client:
+            name = "OpenAI" if self.api_choice == "openai" else "Groq"
+            raise RuntimeError(f"{name} client not available or not installed.")
+        return self.client
+
+    @staticmethod
+    def _require_ollama() -> Any:
+        """Liefert das Ollama-Package.
+
+        Returns:
+            Das Modul `ollama`.
+
+        Raises:
+            RuntimeError: Wenn das Ollama-Package nicht installiert ist.
+        """
+        ollama = _import_ollama()
+        if not ollama:
+            raise RuntimeError(
+                "Ollama Python package not available. "
+                "Please install it via `pip install ollama`."
+            )
+        return ollama
+
+    @staticmethod
+    def reload_secrets() -> None:
+        """Verwirft die gecachten API-Keys.
+
+        Neue LLMClient-Instanzen lesen secrets.env, die Umgebungsvariablen und
+        ggf. Colab-userdata danach erneut ein, z.B. nach dem Ändern eines Keys.
+
+        Examples:
+            >>> os.environ["OPENAI_API_KEY"] = "sk-new"
+            >>> LLMClient.reload_secrets()
+            >>> client = LLMClient()
+        """
+        _load_secrets.cache_clear()
+
+    @staticmethod
+    def close_pool() -> None:
+        """Schließt alle geteilten OpenAI- und Groq-Clients.
+
+        Danach erstellen neue LLMClient-Instanzen wieder eigene Verbindungen.
+        Bestehende Instanzen sollten nach dem Aufruf nicht mehr genutzt werden.
+
+        Examples:
+            >>> import atexit
+            >>> atexit.register(LLMClient.close_pool)
+        """
+        with _CLIENT_POOL_LOCK:
+            clients = list(_CLIENT_POOL.values())
+            _CLIENT_POOL.clear()
+        for client in clients:
+            client.close()
+
+    def clear_cache(self) -> None:
+        """Leert den Antwort-Cache und setzt die Zähler zurück."""
+        with self._cache_lock:
+            self._cache.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+        if self._disk_cache is not None:
+            self._disk_cache.clear()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
+    def _cache_enabled(self) -> bool:
+        """Prüft, ob Antworten für die aktuelle Konfiguration gecacht werden.
+
+        Antworten mit temperature > 0 sind nicht deterministisch und werden
+        nur mit `cache_nondeterministic=True` gecacht.
+
+        Returns:
+            True, wenn ein Cache aktiv ist und gecacht werden darf.
+        """
+        if self.cache_size <= 0 and self._disk_cache is None:
+            return False
+        return self._responses_reusable()
+
+    def _responses_reusable(self) -> bool:
+        """Prüft, ob eine Antwort für mehrere identische Requests genutzt werden darf.
+
+        Gilt für Cache und Request-Deduplizierung gleichermaßen: bei
+        temperature > 0 soll jeder Request eine eigene Stichprobe erhalten,
+        außer `cache_nondeterministic=True` ist gesetzt.
+
+        Returns:
+            True, wenn Antworten wiederverwendet werden dürfen.
+        """
+        return self.temperature == 0 or self.cache_nondeterministic
+
+    def _request_key(self, messages: list[dict[str, str]]) -> str:
+        """Berechnet den Schlüssel für Cache und Request-Deduplizierung.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Hex-Digest über Modell, Sampling-Parameter und Nachrichten.
+        """
+        payload = orjson.dumps(
+            {
+                "model": self.llm,
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+                "messages": messages,
+            },
+            option=orjson.OPT_SORT_KEYS,
+            default=str,
+        )
+        return hashlib.blake2b(payload).hexdigest()
+
+    def _semantic_query(self, messages: list[dict[str, str]]) -> tuple[str, Any] | None:
+        """Bereitet die Suche im semantischen Cache vor.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Tupel aus Namensraum und Embedding der letzten Nutzer-Nachricht,
+            oder None, wenn der semantische Cache nicht genutzt werden kann.
+        """
+        if self.semantic_cache is None or self.temperature > self.semantic_cache.max_temperature:
+            return None
+        if not messages or messages[-1].get("role") != "user":
+            return None
+
+        context = orjson.dumps(
+            {"model": self.llm, "max_tokens": self.max_tokens, "messages": messages[:-1]},
+            option=orjson.OPT_SORT_KEYS,
+            default=str,
+        )
+        namespace = hashlib.blake2b(context).hexdigest()
+        return namespace, self.semantic_cache.encode(messages[-1]["content"])
+
+    def _cache_get(self, key: str) -> str | None:
+        """Liest eine Antwort aus dem In-Memory- oder Disk-Cache.
+
+        Args:
+            key: Cache-Schlüssel aus `_request_key()`.
+
+        Returns:
+            Die gecachte Antwort oder None.
+        """
+        with self._cache_lock:
+            response = self._cache.get(key)
+            if response is not None:
+                self._cache.move_to_end(key)
+                return response
+
+        if self._disk_cache is not None:
+            response = cast(str | None, self._disk_cache.get(key))
+            if response is not None:
+                self._remember(key, response)
+                return response
+
+        return None
+
+    def _cache_set(self, key: str, response: str) -> None:
+        """Speichert eine Antwort im In-Memory- und ggf. im Disk-Cache.
+
+        Args:
+            key: Cache-Schlüssel aus `_request_key()`.
+            response: Die zu speichernde Antwort.
+        """
+        self._remember(key, response)
+        if self._disk_cache is not None:
+            self._disk_cache.set(key, response)
+
+    def _remember(self, key: str, response: str) -> None:
+        """Legt eine Antwort im LRU-Cache ab und verdrängt ggf. den ältesten Eintrag.
+
+        Args:
+            key: Cache-Schlüssel aus `_request_key()`.
+            response: Die zu speichernde Antwort.
+        """
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _canonicalize(self, messages: list[dict[str, str]]) -> list[dict[str, str]]:
+        """Bringt Kontext-Blöcke in eine stabile Reihenfolge (nur mit `stable_context`).
+
+        System-Nachrichten und alle Nachrichten mit role "context" werden zu
+        einer führenden System-Nachricht zusammengefasst; die Kontext-Blöcke
+        sind dabei nach einem Hash ihres Inhalts sortiert. Die übrigen
+        Nachrichten folgen in ursprünglicher Reihenfolge, sodass die aktuelle
+        Nutzer-Anfrage am Ende steht.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Die kanonische Nachrichtenliste oder `messages` unverändert, wenn
+            `stable_context` deaktiviert ist oder keine Kontext-Blöcke vorliegen.
+        """
+        if not self.stable_context or not any(m["role"] == "context" for m in messages):
+            return messages
+
+        system = [m["content"] for m in messages if m["role"] == "system"]
+        context = sorted(
+            (m["content"] for m in messages if m["role"] == "context"),
+            key=lambda content: hashlib.blake2b(content.encode("utf-8")).hexdigest(),
+        )
+        rest = [m for m in messages if m["role"] not in ("system", "context")]
+
+        return [{"role": "system", "content": "\n\n".join(system + context)}] + rest
+
+    def _prepare_messages(self, messages: list[dict[str, str]]) -> list[dict[str, str]]:
+        """Bereitet Nachrichten für einen Request auf, der nicht über den Cache läuft.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Die kanonisierten und ggf. gekürzten Nachrichten.
+        """
+        return self._truncate_messages(self._canonicalize(messages))
+
+    def _truncate_messages(self, messages: list[dict[str, str]]) -> list[dict[str, str]]:
+        """Kürzt den Verlauf auf `max_input_tokens` gemäß `history_strategy`.
+
+        System-Nachrichten am Anfang und die neuesten Nachrichten bleiben
+        erhalten, da Modelle Informationen am Anfang und Ende des Kontexts
+        am zuverlässigsten nutzen. Bei "summarize" werden die verworfenen
+        Nachrichten durch eine Zusammenfassung als System-Nachricht ersetzt.
+
+        Args:
+            messages: Liste von Nachrichten im Chat-Format.
+
+        Returns:
+            Der ggf. gekürzte Verlauf.
+        """
+        if self.history_strategy == "none":
+            return messages
+
+        # Jede Nachricht nur einmal zählen
+        costs = [self._count_message_tokens(m) for m in messages]
+        if sum(costs) <= self.max_input_tokens:
+            return messages
+
+        n_pinned = 0
+        while n_pinned < len(messages) and messages[n_pinned]["role"] == "system":
+            n_pinned += 1
+        pinned, turns = messages[:n_pinned], messages[n_pinned:]
+        turn_costs = costs[n_pinned:]
+
+        # Bei "summarize" ein Viertel des Budgets für die Zusammenfassung reservieren
+        budget = self.max_input_tokens - sum(costs[:n_pinned])
+        if self.history_strategy == "summarize":
+            budget -= self.max_input_tokens // 4
+
+        # Neueste Nachrichten behalten, mindestens die letzte
+        n_kept = 1
+        used = turn_costs[-1] if turn_costs else 0
+        while n_kept < len(turns) and used + turn_costs[-(n_kept + 1)] <= budget:
+            used += turn_costs[-(n_kept + 1)]
+            n_kept += 1
+        dropped, kept = turns[:-n_kept], turns[-n_kept:]
+
+        if self.history_strategy == "summarize" and dropped:
+            summary = self._summarize(dropped)
+            pinned = pinned + [
+                {"role": "system", "content": f"Summary of earlier turns: {summary}"}
+            ]
+
+        return pinned + kept
+
+    def _summarize(self, messages: list[dict[str, str]]) -> str:
+        """Fasst einen Teil des Verlaufs mit dem aktuellen Modell zusammen.
+
+        Args:
+            messages: Die zusammenzufassenden Nachrichten.
+
+        Returns:
+            Die Zusammenfassung als String.
+        """
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        return self.chat_completion(
+            [
+                {
+                    "role": "user",
+                    "content": "Summarize the following conversation concisely. "
+                    "Keep facts, decisions and open questions.\n\n" + transcript,
+                }
+            ]
+        )
+
+    def _count_message_tokens(self, message: dict[str, str]) -> int:
+        """Schätzt die Anzahl der Tokens einer einzelnen Nachricht.
+
+        Nutzt tiktoken, falls es das Modell kennt, sonst ca. 4 Zeichen pro Token.
+
+        Args:
+            message: Nachricht im Chat-Format.
+
+        Returns:
+            Geschätzte Anzahl der Tokens inkl. ca. 4 Tokens Overhead.
+        """
+        if self._encoding is None and not self._encoding_unavailable:
+            try:
+                import tiktoken
+
+                self._encoding = tiktoken.encoding_for_model(self.llm)
+            except Exception:
+                # tiktoken fehlt, kennt das Modell nicht oder ist offline
+                self._encoding_unavailable = True
+
+        content = message["content"] or ""
+        if self._encoding is not None:
+            return len(self._encoding.encode(content)) + 4
+        return len(content) // 4 + 4
+
+    def _ollama_options(self) -> dict[str, Any]:
+        """Erstellt die Sampling-Optionen für Ollama-Requests.
+
+        Returns:
+            Dict mit den Ollama-Optionen.
+        """
+        return {
+            "temperature": self.temperature,
+            "num_predict": self.max_tokens,
+            "repeat_penalty": 1.2,
+            "top_k": 10,
+            "top_p": 0.5,
+        }
 
     def __repr__(self) -> str:
         """Gibt eine String-Repräsentation des Clients zurück.
@@ -7,9 +7,12 @@ Dieses Modul enthält Dienstfunktionen zur Verarbeitung von PDF-Dateien
 und zum Erstellen eines Vektorindexes mit Chroma und LlamaIndex.
 """
 
+import hashlib
+import itertools
+import logging
 import os
-import random
 import chromadb
+from concurrent.futures import ProcessPoolExecutor
 import requests
 from typing import Any
 from llama_index.readers.file.unstructured import UnstructuredReader
@@ -28,12 +31,33 @@ try:
 except ImportError:
     OpenAIError = Exception  # Fallback für OpenAI nicht installiert
 
+logger = logging.getLogger(__name__)
+
+
+def _load_one(file_path: str) -> list[Document]:
+    """
+    Liest eine einzelne PDF-Datei mit einem eigenen `UnstructuredReader` ein.
+
+    Die Funktion liegt auf Modulebene, damit sie an Worker-Prozesse übergeben werden kann.
+
+    Args:
+        file_path (str): Pfad zur PDF-Datei.
+
+    Returns:
+        list[Document]: Die aus der PDF-Datei erzeugten Dokumente.
+    """
+    return UnstructuredReader().load_data(file_path)
+
 
 def read_pdf_files_with_unstructured_reader(pdf_directory: str = "pdfs") -> list[Document]:
     """
     Liest alle PDF-Dateien in einem angegebenen Verzeichnis mithilfe des `UnstructuredReader`
     aus LlamaIndex ein und gibt eine Liste von `Document`-Objekten zurück.
 
+    Die PDFs werden parallel in mehreren Prozessen verarbeitet (höchstens eine pro CPU-Kern).
+    Jede verarbeitete Datei wird im Hauptprozess auf INFO-Level geloggt, z.B. nach
+    `logging.basicConfig(level=logging.INFO)` im Notebook.
+
     Args:
         pdf_directory (str): Pfad zum Verzeichnis, das die PDF-Dateien enthält.
                              Standardmäßig wird das Unterverzeichnis 'pdfs' verwendet.
@@ -50,48 +74,66 @@ def read_pdf_files_with_unstructured_reader(pdf_directory: str = "pdfs") -> list
             f"The folder '{pdf_directory}' does not exist. Please create it and add PDF files."
         )
 
-    reader = UnstructuredReader()
-    all_documents = []
+    paths = [
+        os.path.join(pdf_directory, filename)
+        for filename in sorted(os.listdir(pdf_directory))
+        if filename.lower().endswith(".pdf")
+    ]
+    if not paths:
+        return []
 
-    # Loop through PDF files in the folder and read each one individually
-    for filename in os.listdir(pdf_directory):
-        print("File:" + filename)
-        if filename.lower().endswith(".pdf"):
-            file_path = os.path.join(pdf_directory, filename)
-            docs = reader.load_data(file_path)
-            all_documents.extend(docs)
+    # Each PDF is independent, so parse them in parallel worker processes. Logging happens
+    # here, because workers started via spawn/forkserver do not inherit the logging setup.
+    results = []
+    with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as executor:
+        for path, documents in zip(paths, executor.map(_load_one, paths), strict=True):
+            logger.info("File: %s", os.path.basename(path))
+            results.append(documents)
 
-    return all_documents
+    return list(itertools.chain.from_iterable(results))
 
 
-def create_chromadb_vector_store_and_index(all_documents: list[Document]) -> VectorStoreIndex:
+def create_chromadb_vector_store_and_index(
+    all_documents: list[Document], persist_directory: str = ".chroma"
+) -> VectorStoreIndex:
     """
-    Erstellt einen temporären Chroma-Datenbank-Client und baut einen
+    Erstellt einen persistenten Chroma-Datenbank-Client und baut einen
     `VectorStoreIndex` aus den übergebenen Dokumenten auf.
 
-    Bestehende Sammlungen (Collections) werden gelöscht, bevor eine neue erstellt wird.
+    Der Name der Collection ist ein Hash über die Inhalte aller Dokumente. Existiert
+    bereits eine vollständig aufgebaute Collection für dieselben Dokumente, wird sie
+    ohne erneutes Embedding wiederverwendet. Andernfalls werden bestehende Collections
+    gelöscht und eine neue erstellt.
 
     Args:
         all_documents (list[Document]): Eine Liste von Dokumenten, die in den Vektorspeicher
                                         aufgenommen werden sollen.
+        persist_directory (str): Verzeichnis, in dem Chroma die Vektoren speichert.
+                                 Standardmäßig '.chroma'.
 
     Returns:
         VectorStoreIndex: Ein Vektorindex, der für semantische Suche und RAG-Anwendungen verwendet werden kann.
     """
-    # Chroma will store vectors in a temporary database
-    chroma_client = chromadb.EphemeralClient()
+    # Chroma stores the vectors on disk so they survive notebook restarts
+    chroma_client = chromadb.PersistentClient(path=persist_directory)
 
-    # Get the current collections (if any) and clear them
-    existing_collections = chroma_client.list_collections()
-    # Loop through the collections and delete them by name
-    for collection in existing_collections:
-        # Extract the collection name and delete it
-        collection_name = collection.name  # Assuming the 'Collection' object has a 'name' attribute
-        chroma_client.delete_collection(collection_name)
+    # Fingerprint of the document contents, used as collection name
+    manifest = hashlib.sha256("".join(sorted(doc.hash for doc in all_documents)).encode())
+    collection_name = f"dlml-{manifest.hexdigest()[:32]}"
 
-    # add random number because deleting a collection not really deletes it -
-    # this also does not help...
-    chroma_collection = chroma_client.create_collection(f"dlml{random.randint(0, 100)}")
+    # Reuse the collection if it was completely built for the same documents
+    chroma_collection = chroma_client.get_or_create_collection(collection_name)
+    metadata = chroma_collection.metadata or {}
+    if metadata.get("num_documents") == len(all_documents):
+        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+        return VectorStoreIndex.from_vector_store(vector_store)
+
+    # The documents changed (or the last build was interrupted): clear all collections
+    for collection in chroma_client.list_collections():
+        # Newer Chroma versions return names instead of Collection objects
+        chroma_client.delete_collection(getattr(collection, "name", collection))
+
+    chroma_collection = chroma_client.create_collection(collection_name)
 
     vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
 
@@ -100,6 +142,9 @@ def create_chromadb_vector_store_and_index(all_documents: list[Document]) -> Vec
     # here the documents are stored in the database
     index = VectorStoreIndex.from_documents(all_documents, storage_context=storage_context)
 
+    # Mark the collection as complete so the next call can reuse it
+    chroma_collection.modify(metadata={"num_documents": len(all_documents)})
+
     return index
 
 
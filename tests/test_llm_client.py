@@ -1,59 +1,83 @@
 """Erweiterte Tests für LLMClient mit Type-Checking und Edge Cases."""
 
-import importlib
+import asyncio
+import importlib.util
+import inspect
+import itertools
+import json
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from llm_client import LLMClient, llm_client
+from llm_client import LLMClient, PoolConfig, SemanticCache, llm_client
 
 
 @pytest.fixture(autouse=True)
-def clear_env(monkeypatch):
-    """Sorgt dafür, dass API Keys sauber getestet werden."""
-    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+def env(monkeypatch):
+    """
+    Sorgt für eine saubere Umgebung: Groq-Key und OLLAMA_HOST werden entfernt,
+    OPENAI_API_KEY wird auf einen Dummy gesetzt, damit die
+    OpenAI-Client-Initialisierung nicht fehlschlägt.
+    """
     monkeypatch.delenv("GROQ_API_KEY", raising=False)
     monkeypatch.delenv("OLLAMA_HOST", raising=False)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-testdummy")
 
 
 @pytest.fixture(autouse=True)
-def set_dummy_openai_key(monkeypatch):
+def reset_shared_state():
+    """Verhindert, dass gecachte API-Keys und gepoolte (ggf. gemockte) SDK-Clients
+    zwischen Tests geteilt werden."""
+    LLMClient.reload_secrets()
+    LLMClient.close_pool()
+    yield
+    LLMClient.reload_secrets()
+    LLMClient.close_pool()
+
+
+@pytest.fixture
+def mocked_openai_client(monkeypatch):
+    """Erstellt einen OpenAI-LLMClient mit gemocktem SDK-Client.
+
+    Returns:
+        Tupel aus LLMClient und dem Mock für `chat.completions.create`.
     """
-    Setzt einen Dummy OPENAI_API_KEY für alle Tests automatisch,
-    damit OpenAI-Client-Initialisierung nicht fehlschlägt.
-    """
-    monkeypatch.setenv("OPENAI_API_KEY", "sk-testdummy")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    with patch("openai.OpenAI") as mock_openai:
+        client = LLMClient(api_choice="openai")
+
+    return client, mock_openai.return_value.chat.completions.create
 
 
 class TestLLMClientInitialization:
     """Tests für die Initialisierung des LLMClient."""
 
-    def test_auto_select_openai(self, monkeypatch):
-        """Test: OpenAI wird automatisch gewählt wenn API Key vorhanden."""
-        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
-        client = LLMClient()
-        assert client.api_choice == "openai"
-        assert client.llm.startswith("gpt")
-
-    def test_auto_select_groq(self, monkeypatch):
-        """Test: Groq wird automatisch gewählt wenn API Key vorhanden."""
+    @pytest.mark.parametrize(
+        "env_vars, expected_api, expected_model",
+        [
+            ({"OPENAI_API_KEY": "sk-test"}, "openai", "gpt"),
+            ({"GROQ_API_KEY": "groq-test"}, "groq", "moonshotai"),
+            ({}, "ollama", "llama"),
+        ],
+        ids=["openai", "groq", "ollama"],
+    )
+    def test_auto_select(self, monkeypatch, env_vars, expected_api, expected_model):
+        """Test: Die API wird anhand der vorhandenen API Keys automatisch gewählt."""
         monkeypatch.delenv("OPENAI_API_KEY", raising=False)
-        monkeypatch.setenv("GROQ_API_KEY", "groq-test")
+        monkeypatch.delenv("COLAB_GPU", raising=False)
+        for name, value in env_vars.items():
+            monkeypatch.setenv(name, value)
+
         client = LLMClient()
-        assert client.api_choice == "groq"
-        assert "moonshotai" in client.llm.lower()
-
-    # def test_auto_select_ollama(self, monkeypatch):
-    #     """Test: Ollama wird automatisch gewählt wenn keine API Keys vorhanden."""
-    #     # Stelle sicher, dass keine API Keys gesetzt sind
-    #     monkeypatch.delenv("OPENAI_API_KEY", raising=False)
-    #     monkeypatch.delenv("GROQ_API_KEY", raising=False)
-    #     monkeypatch.delenv("COLAB_GPU", raising=False)
-    #
-    #     client = LLMClient()
-    #     assert client.api_choice == "ollama"
-    #     assert "llama" in client.llm.lower()
+
+        assert client.api_choice == expected_api
+        assert expected_model in client.llm.lower()
 
     def test_manual_override_to_ollama(self, monkeypatch):
         """Test: API kann manuell auf Ollama gesetzt werden."""
@@ -73,21 +97,25 @@ class TestLLMClientInitialization:
         with pytest.raises(ValueError, match="Invalid api_choice"):
             LLMClient(api_choice="invalid_api")
 
-    def test_set_custom_model_and_temperature(self):
-        """Test: Benutzerdefiniertes Modell und Temperatur."""
-        client = LLMClient(llm="gpt-4o", temperature=0.5)
-        assert client.llm == "gpt-4o"
-        assert client.temperature == 0.5
-
-    def test_set_custom_max_tokens(self):
-        """Test: Benutzerdefinierte max_tokens."""
-        client = LLMClient(max_tokens=2048)
-        assert client.max_tokens == 2048
-
-    def test_set_custom_keep_alive(self):
-        """Test: Benutzerdefinierter keep_alive Parameter."""
-        client = LLMClient(keep_alive="10m")
-        assert client.keep_alive == "10m"
+    @pytest.mark.parametrize(
+        "kwargs, attr, expected",
+        [
+            ({}, "temperature", 0.7),
+            ({"temperature": 0.0}, "temperature", 0.0),
+            ({"temperature": 0.5}, "temperature", 0.5),
+            ({"temperature": 2.0}, "temperature", 2.0),
+            ({"llm": "gpt-4o"}, "llm", "gpt-4o"),
+            ({"max_tokens": 1}, "max_tokens", 1),
+            ({"max_tokens": 2048}, "max_tokens", 2048),
+            ({"max_tokens": 100000}, "max_tokens", 100000),
+            ({"keep_alive": "10m"}, "keep_alive", "10m"),
+        ],
+    )
+    def test_custom_parameters_are_stored(self, kwargs, attr, expected):
+        """Test: Benutzerdefinierte Parameter werden als Attribute übernommen."""
+        # Ollama benötigt keinen SDK-Client, daher bleibt die Initialisierung billig
+        client = LLMClient(api_choice="ollama", **kwargs)
+        assert getattr(client, attr) == expected
 
     def test_openai_client_initialization(self, monkeypatch):
         """Test: OpenAI Client wird korrekt initialisiert."""
@@ -96,6 +124,30 @@ class TestLLMClientInitialization:
         assert client.openai_api_key == "sk-test-key"
         assert client.api_choice == "openai"
 
+    def test_ollama_does_not_import_sdk_clients(self):
+        """Test: Für Ollama werden die SDKs von OpenAI und Groq nicht importiert."""
+        with patch("llm_client.llm_client._import_sdk_client") as mock_import:
+            LLMClient(api_choice="ollama")
+
+        mock_import.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "api_choice,backend,stream_backend",
+        [
+            ("openai", "_chat_sdk", "_stream_sdk"),
+            ("groq", "_chat_sdk", "_stream_sdk"),
+            ("ollama", "_chat_ollama", "_stream_ollama"),
+        ],
+    )
+    def test_backend_bound_at_initialization(
+        self, monkeypatch, api_choice, backend, stream_backend
+    ):
+        """Test: Die Backends werden einmalig passend zu api_choice gebunden."""
+        monkeypatch.setenv("GROQ_API_KEY", "gsk-test")
+        client = LLMClient(api_choice=api_choice)
+        assert client._chat_backend == getattr(client, backend)
+        assert client._stream_backend == getattr(client, stream_backend)
+
     def test_groq_client_initialization(self, monkeypatch):
         """Test: Groq Client wird korrekt initialisiert."""
         monkeypatch.setenv("GROQ_API_KEY", "gsk-test-key")
@@ -104,28 +156,137 @@ class TestLLMClientInitialization:
         assert client.api_choice == "groq"
 
 
-class TestLLMClientChatCompletion:
-    """Tests für die chat_completion Methode."""
+class TestLLMClientSecrets:
+    """Tests für das Laden der API-Keys."""
 
-    def test_chat_completion_with_openai(self, monkeypatch):
-        """Test: chat_completion mit OpenAI (gemockt)."""
+    def test_secrets_loaded_once_per_path(self, monkeypatch):
+        """Test: Weitere Instanzen verwenden die gecachten API-Keys."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-first")
+        LLMClient(api_choice="ollama")
+
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-second")
+        client = LLMClient(api_choice="ollama")
+
+        assert client.openai_api_key == "sk-first"
+
+    def test_reload_secrets_reads_keys_again(self, monkeypatch):
+        """Test: reload_secrets sorgt für erneutes Einlesen der API-Keys."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-first")
+        LLMClient(api_choice="ollama")
+
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-second")
+        LLMClient.reload_secrets()
+        client = LLMClient(api_choice="ollama")
+
+        assert client.openai_api_key == "sk-second"
+
+    def test_secrets_file_is_loaded(self, monkeypatch, tmp_path):
+        """Test: API-Keys werden aus der secrets.env-Datei gelesen."""
+        # load_dotenv schreibt direkt in os.environ; die Kopie wird nach dem Test verworfen
+        monkeypatch.setattr(os, "environ", os.environ.copy())
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        secrets = tmp_path / "secrets.env"
+        secrets.write_text("GROQ_API_KEY=gsk-from-file\n")
+
+        client = LLMClient(secrets_path=str(secrets))
+
+        assert client.groq_api_key == "gsk-from-file"
+        assert client.api_choice == "groq"
+
+
+class TestLLMClientPool:
+    """Tests für den geteilten Pool von SDK-Clients."""
+
+    def test_clients_with_same_config_share_sdk_client(self, monkeypatch):
+        """Test: Gleiche API und gleicher Key teilen sich einen SDK-Client."""
         monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
 
-        # Mock OpenAI response
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = "OpenAI response"
+        with patch("openai.OpenAI") as mock_openai:
+            first = LLMClient(api_choice="openai")
+            second = LLMClient(api_choice="openai", llm="gpt-4o")
 
-        with patch("llm_client.llm_client.OpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_client.chat.completions.create.return_value = mock_response
-            mock_openai.return_value = mock_client
+        assert first.client is second.client
+        mock_openai.assert_called_once()
+
+    def test_different_keys_use_different_sdk_clients(self, monkeypatch):
+        """Test: Unterschiedliche API-Keys ergeben getrennte SDK-Clients."""
+        with patch("openai.OpenAI", side_effect=lambda **_: MagicMock()):
+            monkeypatch.setenv("OPENAI_API_KEY", "sk-first")
+            first = LLMClient(api_choice="openai")
+            monkeypatch.setenv("OPENAI_API_KEY", "sk-second")
+            LLMClient.reload_secrets()
+            second = LLMClient(api_choice="openai")
+
+        assert first.client is not second.client
 
+    def test_pool_config_is_applied(self):
+        """Test: Die PoolConfig bestimmt die Limits des httpx-Clients."""
+        config = PoolConfig(max_connections=10, max_keepalive_connections=4, idle_timeout=30.0)
+
+        with patch("httpx.Client") as mock_http_client:
+            config.create_http_client()
+
+        limits = mock_http_client.call_args[1]["limits"]
+        assert limits.max_connections == 10
+        assert limits.max_keepalive_connections == 4
+        assert limits.keepalive_expiry == 30.0
+
+    def test_pool_config_timeouts(self):
+        """Test: Die PoolConfig bestimmt die Timeouts des httpx-Clients."""
+        config = PoolConfig(timeout=20.0, connect_timeout=2.0)
+
+        with patch("httpx.Client") as mock_http_client:
+            config.create_http_client()
+
+        timeout = mock_http_client.call_args[1]["timeout"]
+        assert timeout.read == 20.0
+        assert timeout.connect == 2.0
+
+    @pytest.mark.parametrize("h2_installed", [True, False])
+    def test_http2_requires_h2(self, h2_installed):
+        """Test: HTTP/2 wird nur genutzt, wenn das Paket h2 installiert ist."""
+        spec = MagicMock() if h2_installed else None
+
+        with (
+            patch("importlib.util.find_spec", return_value=spec),
+            patch("httpx.Client") as mock_http_client,
+        ):
+            PoolConfig().create_http_client()
+
+        assert mock_http_client.call_args[1]["http2"] is h2_installed
+
+    def test_http2_can_be_disabled(self):
+        """Test: Mit http2=False wird immer HTTP/1.1 verwendet."""
+        with patch("httpx.Client") as mock_http_client:
+            PoolConfig(http2=False).create_http_client()
+
+        assert mock_http_client.call_args[1]["http2"] is False
+
+    def test_close_pool_closes_sdk_clients(self, monkeypatch):
+        """Test: close_pool schließt und entfernt alle geteilten Clients."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+        with patch("openai.OpenAI") as mock_openai:
             client = LLMClient(api_choice="openai")
-            messages = [{"role": "user", "content": "Hello"}]
-            response = client.chat_completion(messages)
+            LLMClient.close_pool()
+            LLMClient(api_choice="openai")
 
-            assert response == "OpenAI response"
-            mock_client.chat.completions.create.assert_called_once()
+        client.client.close.assert_called_once()
+        assert mock_openai.call_count == 2
+
+
+class TestLLMClientChatCompletion:
+    """Tests für die chat_completion Methode."""
+
+    def test_chat_completion_with_openai(self, mocked_openai_client):
+        """Test: chat_completion mit OpenAI (gemockt)."""
+        client, mock_create = mocked_openai_client
+        mock_create.return_value.choices[0].message.content = "OpenAI response"
+
+        response = client.chat_completion([{"role": "user", "content": "Hello"}])
+
+        assert response == "OpenAI response"
+        mock_create.assert_called_once()
 
     def test_chat_completion_with_groq(self, monkeypatch):
         """Test: chat_completion mit Groq (gemockt)."""
@@ -135,7 +296,7 @@ class TestLLMClientChatCompletion:
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Groq response"
 
-        with patch("llm_client.llm_client.Groq") as mock_groq:
+        with patch("groq.Groq") as mock_groq:
             mock_client = MagicMock()
             mock_client.chat.completions.create.return_value = mock_response
             mock_groq.return_value = mock_client
@@ -151,19 +312,19 @@ class TestLLMClientChatCompletion:
         """Test: chat_completion mit Ollama (gemockt)."""
         mock_response = {"message": {"content": "Ollama response"}}
 
-        with patch("llm_client.llm_client.ollama") as mock_ollama:
-            mock_ollama.chat.return_value = mock_response
+        with patch("ollama.chat") as mock_chat:
+            mock_chat.return_value = mock_response
 
             client = LLMClient(api_choice="ollama")
             messages = [{"role": "user", "content": "Hello"}]
             response = client.chat_completion(messages)
 
             assert response == "Ollama response"
-            mock_ollama.chat.assert_called_once()
+            mock_chat.assert_called_once()
 
     def test_chat_completion_without_openai_client_raises_error(self):
         """Test: RuntimeError wenn OpenAI Client nicht verfügbar."""
-        with patch("llm_client.llm_client.OpenAI", None):
+        with patch.dict(sys.modules, {"openai": None}):
             client = LLMClient(api_choice="openai")
             client.client = None
 
@@ -172,7 +333,7 @@ class TestLLMClientChatCompletion:
 
     def test_chat_completion_without_groq_client_raises_error(self):
         """Test: RuntimeError wenn Groq Client nicht verfügbar."""
-        with patch("llm_client.llm_client.Groq", None):
+        with patch.dict(sys.modules, {"groq": None}):
             client = LLMClient(api_choice="groq")
             client.client = None
 
@@ -181,21 +342,59 @@ class TestLLMClientChatCompletion:
 
     def test_missing_ollama_package(self, monkeypatch):
         """Test: RuntimeError wenn Ollama Package nicht verfügbar."""
-        # Entferne ollama vollständig aus sys.modules
-        sys.modules["ollama"] = None
+        # ollama wird erst beim Request importiert, daher genügt ein Eintrag in sys.modules
+        monkeypatch.setitem(sys.modules, "ollama", None)
 
-        # Modul llm_client neu laden
-        importlib.reload(llm_client)
-
-        # Jetzt Instanz mit ollama-API erstellen
-        client = llm_client.LLMClient(api_choice="ollama")
+        client = LLMClient(api_choice="ollama")
 
         with pytest.raises(RuntimeError, match="Ollama Python package not available"):
             client.chat_completion([{"role": "user", "content": "test"}])
 
-        # Cleanup: ollama wiederherstellen
-        del sys.modules["ollama"]
-        importlib.reload(llm_client)
+    def test_chat_completion_stream_with_openai(self, mocked_openai_client):
+        """Test: chat_completion_stream liefert die Deltas von OpenAI (gemockt)."""
+        client, mock_create = mocked_openai_client
+
+        chunks = []
+        for text in ["Open", None, "AI"]:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            chunks.append(chunk)
+        mock_create.return_value = iter(chunks)
+
+        deltas = list(client.chat_completion_stream([{"role": "user", "content": "Hello"}]))
+
+        assert deltas == ["Open", "", "AI"]
+        assert mock_create.call_args[1]["stream"] is True
+
+    def test_chat_completion_stream_without_ollama_package(self, monkeypatch):
+        """Test: RuntimeError beim Streaming, wenn Ollama Package nicht verfügbar."""
+        monkeypatch.setitem(sys.modules, "ollama", None)
+        client = LLMClient(api_choice="ollama")
+
+        with pytest.raises(RuntimeError, match="Ollama Python package not available"):
+            list(client.chat_completion_stream([{"role": "user", "content": "test"}]))
+
+    def test_chat_completion_stream_with_ollama(self):
+        """Test: chat_completion_stream liefert die Deltas von Ollama (gemockt)."""
+        chunks = [{"message": {"content": "Oll"}}, {"message": {"content": "ama"}}]
+
+        with patch("ollama.chat") as mock_chat:
+            mock_chat.return_value = iter(chunks)
+
+            client = LLMClient(api_choice="ollama")
+            deltas = list(client.chat_completion_stream([{"role": "user", "content": "Hello"}]))
+
+            assert deltas == ["Oll", "ama"]
+            assert mock_chat.call_args[1]["stream"] is True
+
+    def test_chat_completion_with_stream_joins_deltas(self):
+        """Test: chat_completion(stream=True) fügt die Deltas zusammen."""
+        client = LLMClient(api_choice="ollama")
+
+        with patch.object(client, "chat_completion_stream", return_value=iter(["a", "b"])):
+            response = client.chat_completion([{"role": "user", "content": "Hi"}], stream=True)
+
+        assert response == "ab"
 
     def test_chat_completion_parameters_passed_correctly(self, monkeypatch):
         """Test: Parameter werden korrekt an die API übergeben."""
@@ -204,7 +403,7 @@ class TestLLMClientChatCompletion:
         mock_response = MagicMock()
         mock_response.choices[0].message.content = "Response"
 
-        with patch("llm_client.llm_client.OpenAI") as mock_openai:
+        with patch("openai.OpenAI") as mock_openai:
             mock_client = MagicMock()
             mock_client.chat.completions.create.return_value = mock_response
             mock_openai.return_value = mock_client
@@ -220,75 +419,664 @@ class TestLLMClientChatCompletion:
             assert call_args[1]["max_tokens"] == 1024
 
 
-class TestLLMClientEdgeCases:
-    """Tests für Edge Cases und spezielle Szenarien."""
+class TestLLMClientCache:
+    """Tests für den Antwort-Cache."""
 
-    def test_empty_messages_list(self, monkeypatch):
-        """Test: Leere Nachrichten-Liste."""
+    def test_identical_request_served_from_cache(self):
+        """Test: Identische Requests treffen die API nur einmal."""
+        client = LLMClient(api_choice="ollama", temperature=0.0)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with patch.object(client, "_create_chat_completion", return_value="Cached") as mock_create:
+            assert client.chat_completion(messages) == "Cached"
+            assert client.chat_completion(list(messages)) == "Cached"
+
+        mock_create.assert_called_once()
+        assert client.cache_hits == 1
+        assert client.cache_misses == 1
+
+    def test_different_parameters_use_different_keys(self):
+        """Test: Modell und Sampling-Parameter gehen in den Cache-Key ein."""
+        client = LLMClient(api_choice="ollama", temperature=0.0)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        key = client._request_key(messages)
+        client.max_tokens = 1024
+        assert client._request_key(messages) != key
+
+    def test_nondeterministic_requests_not_cached_by_default(self):
+        """Test: Bei temperature > 0 wird standardmäßig nicht gecacht."""
+        client = LLMClient(api_choice="ollama", temperature=0.7)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with patch.object(client, "_create_chat_completion", return_value="Fresh") as mock_create:
+            client.chat_completion(messages)
+            client.chat_completion(messages)
+
+        assert mock_create.call_count == 2
+        assert client.cache_hits == 0
+        assert client.cache_misses == 0
+
+    def test_cache_nondeterministic_flag(self):
+        """Test: cache_nondeterministic erlaubt Caching bei temperature > 0."""
+        client = LLMClient(api_choice="ollama", temperature=0.7, cache_nondeterministic=True)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with patch.object(client, "_create_chat_completion", return_value="Cached") as mock_create:
+            client.chat_completion(messages)
+            client.chat_completion(messages)
+
+        mock_create.assert_called_once()
+
+    def test_lru_eviction(self):
+        """Test: Der älteste Eintrag wird bei vollem Cache verdrängt."""
+        client = LLMClient(api_choice="ollama", temperature=0.0, cache_size=2)
+
+        with patch.object(client, "_create_chat_completion", side_effect=lambda m: m[0]["content"]):
+            for content in ["a", "b", "a", "c"]:
+                client.chat_completion([{"role": "user", "content": content}])
+
+        cached = set(client._cache.values())
+        assert cached == {"a", "c"}
+
+    def test_clear_cache(self):
+        """Test: clear_cache leert den Cache und setzt die Zähler zurück."""
+        client = LLMClient(api_choice="ollama", temperature=0.0)
+
+        with patch.object(client, "_create_chat_completion", return_value="Cached"):
+            client.chat_completion([{"role": "user", "content": "Hello"}])
+
+        client.clear_cache()
+        assert len(client._cache) == 0
+        assert client.cache_misses == 0
+
+    def test_disk_cache_persists_between_clients(self, tmp_path):
+        """Test: Der Disk-Cache wird von einer neuen Instanz wiederverwendet."""
+        pytest.importorskip("diskcache")
+        messages = [{"role": "user", "content": "Hello"}]
+
+        first = LLMClient(api_choice="ollama", temperature=0.0, cache_dir=str(tmp_path))
+        with patch.object(first, "_create_chat_completion", return_value="Persisted"):
+            first.chat_completion(messages)
+
+        second = LLMClient(api_choice="ollama", temperature=0.0, cache_dir=str(tmp_path))
+        with patch.object(second, "_create_chat_completion") as mock_create:
+            assert second.chat_completion(messages) == "Persisted"
+
+        mock_create.assert_not_called()
+        assert second.cache_hits == 1
+
+
+class TestLLMClientCacheThreadSafety:
+    """Tests für den Antwort-Cache bei gleichzeitigen Zugriffen."""
+
+    def test_concurrent_requests_keep_cache_consistent(self):
+        """Test: Gleichzeitige Requests mit Verdrängung führen zu keinem Fehler."""
+        client = LLMClient(api_choice="ollama", temperature=0.0, cache_size=4)
+
+        def ask(i):
+            return client.chat_completion([{"role": "user", "content": f"q{i % 16}"}])
+
+        with (
+            patch.object(client, "_create_chat_completion", side_effect=lambda m: m[0]["content"]),
+            ThreadPoolExecutor(max_workers=8) as executor,
+        ):
+            responses = list(executor.map(ask, range(2000)))
+
+        assert responses == [f"q{i % 16}" for i in range(2000)]
+        assert client.cache_hits + client.cache_misses == 2000
+        assert len(client._cache) <= 4
+
+
+class TestLLMClientRequestDeduplication:
+    """Tests für das Zusammenfassen gleichzeitiger identischer Requests."""
+
+    @staticmethod
+    def _slow_completion(messages):
+        time.sleep(0.1)
+        return "Shared response"
+
+    @pytest.mark.asyncio
+    async def test_achat_completion_deduplicates_inflight_requests(self):
+        """Test: Gleichzeitige identische async Requests erreichen die API einmal."""
+        client = LLMClient(api_choice="ollama", temperature=0.0)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with patch.object(
+            client, "_create_chat_completion", side_effect=self._slow_completion
+        ) as mock_create:
+            responses = await asyncio.gather(*[client.achat_completion(messages) for _ in range(5)])
+
+        assert responses == ["Shared response"] * 5
+        mock_create.assert_called_once()
+        assert client._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_achat_completion_propagates_errors(self):
+        """Test: Fehler werden an alle wartenden Requests weitergegeben."""
+        client = LLMClient(api_choice="ollama", temperature=0.0)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        def failing_completion(messages):
+            time.sleep(0.05)
+            raise RuntimeError("API down")
+
+        with patch.object(client, "_create_chat_completion", side_effect=failing_completion):
+            results = await asyncio.gather(
+                *[client.achat_completion(messages) for _ in range(3)],
+                return_exceptions=True,
+            )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert client._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_first_caller_does_not_cancel_followers(self):
+        """Test: Bricht der erste Aufrufer ab, erhalten die übrigen trotzdem das Ergebnis."""
+        client = LLMClient(api_choice="ollama", temperature=0.0)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with patch.object(
+            client, "_create_chat_completion", side_effect=self._slow_completion
+        ) as mock_create:
+            first = asyncio.create_task(client.achat_completion(messages))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(client.achat_completion(messages))
+            await asyncio.sleep(0)
+            first.cancel()
+
+            assert await follower == "Shared response"
+
+        assert first.cancelled()
+        mock_create.assert_called_once()
+        assert client._inflight == {}
+
+    def test_threaded_requests_are_deduplicated(self):
+        """Test: Gleichzeitige identische Requests aus Threads erreichen die API einmal."""
+        client = LLMClient(api_choice="ollama", temperature=0.0)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with (
+            patch.object(
+                client, "_create_chat_completion", side_effect=self._slow_completion
+            ) as mock_create,
+            ThreadPoolExecutor(max_workers=4) as executor,
+        ):
+            responses = list(executor.map(lambda _: client.chat_completion(messages), range(4)))
+
+        assert responses == ["Shared response"] * 4
+        mock_create.assert_called_once()
+        assert client._inflight_threads == {}
+
+    @pytest.mark.asyncio
+    async def test_nondeterministic_requests_are_not_deduplicated(self):
+        """Test: Bei temperature > 0 erhält jeder Request eine eigene Antwort."""
+        client = LLMClient(api_choice="ollama", temperature=1.0)
+        messages = [{"role": "user", "content": "Hello"}]
+        counter = itertools.count()
+
+        def sample(messages):
+            time.sleep(0.05)
+            return f"sample{next(counter)}"
+
+        with patch.object(client, "_create_chat_completion", side_effect=sample) as mock_create:
+            responses = await client.chat_completion_batch([messages] * 5)
+
+        assert sorted(responses) == [f"sample{i}" for i in range(5)]
+        assert mock_create.call_count == 5
+        assert client._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_nondeterministic_requests_deduplicated_with_flag(self):
+        """Test: cache_nondeterministic erlaubt das Zusammenfassen bei temperature > 0."""
+        client = LLMClient(api_choice="ollama", temperature=1.0, cache_nondeterministic=True)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with patch.object(
+            client, "_create_chat_completion", side_effect=self._slow_completion
+        ) as mock_create:
+            responses = await asyncio.gather(*[client.achat_completion(messages) for _ in range(3)])
+
+        assert responses == ["Shared response"] * 3
+        mock_create.assert_called_once()
+
+
+class TestLLMClientBatch:
+    """Tests für chat_completion_batch."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_batch_respects_concurrency(self):
+        """Test: Höchstens `concurrency` Requests laufen gleichzeitig."""
+        client = LLMClient(api_choice="ollama")
+        lock = threading.Lock()
+        running = 0
+        peak = 0
+
+        def tracked_completion(messages):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return messages[0]["content"].upper()
+
+        batch = [[{"role": "user", "content": f"q{i}"}] for i in range(6)]
+        with patch.object(client, "_create_chat_completion", side_effect=tracked_completion):
+            responses = await client.chat_completion_batch(batch, concurrency=2)
+
+        assert responses == [f"Q{i}" for i in range(6)]
+        assert peak <= 2
+
+    @pytest.mark.asyncio
+    async def test_invalid_batch_mode_raises_error(self):
+        """Test: Ungültiger batch_mode wirft ValueError."""
+        client = LLMClient(api_choice="ollama")
+        with pytest.raises(ValueError, match="Invalid batch_mode"):
+            await client.chat_completion_batch([], batch_mode="invalid")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("concurrency", [0, -1])
+    async def test_invalid_concurrency_raises_error(self, concurrency):
+        """Test: concurrency < 1 wirft ValueError statt endlos zu blockieren."""
+        client = LLMClient(api_choice="ollama")
+        with pytest.raises(ValueError, match="Invalid concurrency"):
+            await client.chat_completion_batch(
+                [[{"role": "user", "content": "q"}]], concurrency=concurrency
+            )
+
+    @pytest.mark.asyncio
+    async def test_async_batch_mode_requires_openai(self):
+        """Test: Die Batch API steht nur für OpenAI zur Verfügung."""
+        client = LLMClient(api_choice="ollama")
+        with pytest.raises(ValueError, match="only supported for OpenAI"):
+            await client.chat_completion_batch([], batch_mode="async")
+
+    @pytest.mark.asyncio
+    async def test_async_batch_mode_uses_openai_batch_api(self, monkeypatch):
+        """Test: Requests werden über die OpenAI Batch API eingereicht."""
         monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
 
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = "Response"
+        def result_line(custom_id, content):
+            body = {"choices": [{"message": {"content": content}}]}
+            return json.dumps(
+                {"custom_id": custom_id, "response": {"status_code": 200, "body": body}}
+            )
 
-        with patch("llm_client.llm_client.OpenAI") as mock_openai:
+        with patch("openai.OpenAI") as mock_openai:
             mock_client = MagicMock()
-            mock_client.chat.completions.create.return_value = mock_response
+            mock_client.files.create.return_value = MagicMock(id="file-in")
+            mock_client.batches.create.return_value = MagicMock(id="batch-1", status="validating")
+            mock_client.batches.retrieve.return_value = MagicMock(
+                id="batch-1", status="completed", output_file_id="file-out"
+            )
+            mock_client.files.content.return_value = MagicMock(
+                text="\n".join([result_line("1", "Second"), result_line("0", "First")])
+            )
             mock_openai.return_value = mock_client
 
             client = LLMClient(api_choice="openai")
-            response = client.chat_completion([])
+            batch = [
+                [{"role": "user", "content": "first"}],
+                [{"role": "user", "content": "second"}],
+            ]
+            responses = await client.chat_completion_batch(
+                batch, batch_mode="async", poll_interval=0
+            )
+
+        assert responses == ["First", "Second"]
+        uploaded = mock_client.files.create.call_args[1]["file"][1].decode().splitlines()
+        assert [json.loads(line)["custom_id"] for line in uploaded] == ["0", "1"]
+        assert mock_client.batches.create.call_args[1]["completion_window"] == "24h"
+
+    @pytest.mark.asyncio
+    async def test_async_batch_mode_truncates_history(self, monkeypatch):
+        """Test: Auch Requests der Batch API werden gemäß history_strategy gekürzt."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        conversation = TestLLMClientHistory._conversation(20)
 
-            assert response == "Response"
+        with patch("openai.OpenAI") as mock_openai:
+            mock_client = MagicMock()
+            mock_client.batches.create.return_value = MagicMock(id="batch-1", status="failed")
+            mock_openai.return_value = mock_client
 
-    def test_multiple_messages(self, monkeypatch):
-        """Test: Mehrere Nachrichten in der Konversation."""
-        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+            client = LLMClient(api_choice="openai", history_strategy="window", max_input_tokens=50)
+            with pytest.raises(RuntimeError):
+                await client.chat_completion_batch([conversation], batch_mode="async")
 
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = "Final response"
+        uploaded = mock_client.files.create.call_args[1]["file"][1].decode()
+        sent = json.loads(uploaded)["body"]["messages"]
+        assert sent == client._truncate_messages(conversation)
+        assert len(sent) < len(conversation)
 
-        with patch("llm_client.llm_client.OpenAI") as mock_openai:
+    @pytest.mark.asyncio
+    async def test_async_batch_mode_failed_job_raises_error(self, monkeypatch):
+        """Test: Ein fehlgeschlagener Batch-Job wirft RuntimeError."""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+        with patch("openai.OpenAI") as mock_openai:
             mock_client = MagicMock()
-            mock_client.chat.completions.create.return_value = mock_response
+            mock_client.batches.create.return_value = MagicMock(id="batch-1", status="failed")
             mock_openai.return_value = mock_client
 
             client = LLMClient(api_choice="openai")
-            messages = [
-                {"role": "system", "content": "You are helpful"},
-                {"role": "user", "content": "Hello"},
-                {"role": "assistant", "content": "Hi"},
-                {"role": "user", "content": "How are you?"},
-            ]
-            response = client.chat_completion(messages)
+            with pytest.raises(RuntimeError, match="status 'failed'"):
+                await client.chat_completion_batch(
+                    [[{"role": "user", "content": "q"}]], batch_mode="async"
+                )
+
+
+class _KeywordEncoder:
+    """Einfacher Encoder: Texte mit gleichem Schlüsselwort sind identisch."""
+
+    def encode(self, text, normalize_embeddings=True):
+        return [1.0, 0.0] if "AI" in text else [0.0, 1.0]
+
+
+class TestSemanticCache:
+    """Tests für den semantischen Cache."""
+
+    @pytest.fixture
+    def semantic_client(self):
+        """Erstellt einen Client, der nur den semantischen Cache nutzt."""
+        pytest.importorskip("faiss")
+        cache = SemanticCache(threshold=0.9, encoder=_KeywordEncoder())
+        return LLMClient(api_choice="ollama", temperature=0.0, cache_size=0, semantic_cache=cache)
+
+    def test_reworded_prompt_hits_cache(self, semantic_client):
+        """Test: Umformulierte Prompts werden aus dem Cache beantwortet."""
+        with patch.object(
+            semantic_client, "_create_chat_completion", return_value="AI answer"
+        ) as mock_create:
+            semantic_client.chat_completion([{"role": "user", "content": "Explain AI."}])
+            response = semantic_client.chat_completion(
+                [{"role": "user", "content": "Can you explain AI?"}]
+            )
+
+        assert response == "AI answer"
+        mock_create.assert_called_once()
+        assert semantic_client.cache_hits == 1
+
+    def test_dissimilar_prompt_misses_cache(self, semantic_client):
+        """Test: Unähnliche Prompts lösen einen API-Aufruf aus."""
+        with patch.object(
+            semantic_client, "_create_chat_completion", return_value="Answer"
+        ) as mock_create:
+            semantic_client.chat_completion([{"role": "user", "content": "Explain AI."}])
+            semantic_client.chat_completion([{"role": "user", "content": "Tell a joke."}])
+
+        assert mock_create.call_count == 2
+        assert len(semantic_client.semantic_cache) == 2
+
+    def test_different_system_prompt_misses_cache(self, semantic_client):
+        """Test: Ein anderer System-Prompt ergibt einen anderen Namensraum."""
+        with patch.object(
+            semantic_client, "_create_chat_completion", return_value="Answer"
+        ) as mock_create:
+            for system in ["Be brief.", "Be verbose."]:
+                semantic_client.chat_completion(
+                    [
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": "Explain AI."},
+                    ]
+                )
+
+        assert mock_create.call_count == 2
+
+    def test_skipped_for_high_temperature(self, semantic_client):
+        """Test: Bei hoher Temperatur wird der semantische Cache übergangen."""
+        semantic_client.temperature = 0.7
+
+        with patch.object(semantic_client, "_create_chat_completion", return_value="Answer"):
+            semantic_client.chat_completion([{"role": "user", "content": "Explain AI."}])
+
+        assert len(semantic_client.semantic_cache) == 0
+
+    def test_exact_hit_skips_embedding(self):
+        """Test: Bei einem exakten Cache-Treffer wird kein Embedding berechnet."""
+        pytest.importorskip("faiss")
+        encoder = MagicMock(wraps=_KeywordEncoder())
+        cache = SemanticCache(threshold=0.9, encoder=encoder)
+        client = LLMClient(api_choice="ollama", temperature=0.0, semantic_cache=cache)
+        messages = [{"role": "user", "content": "Explain AI."}]
+
+        with patch.object(client, "_create_chat_completion", return_value="AI answer"):
+            for _ in range(3):
+                client.chat_completion(messages)
+
+        assert client.cache_hits == 2
+        assert encoder.encode.call_count == 1
+
+    def test_missing_faiss_raises_before_request(self):
+        """Test: Ohne faiss schlägt bereits das Erstellen des Caches fehl."""
+        find_spec = importlib.util.find_spec
+
+        def fake_find_spec(name, *args, **kwargs):
+            return None if name == "faiss" else find_spec(name, *args, **kwargs)
+
+        with (
+            patch("importlib.util.find_spec", side_effect=fake_find_spec),
+            pytest.raises(ImportError, match="faiss is required"),
+        ):
+            SemanticCache(encoder=_KeywordEncoder())
+
+    def test_threshold_from_environment(self, monkeypatch):
+        """Test: Der Schwellwert kann per Umgebungsvariable gesetzt werden."""
+        pytest.importorskip("faiss")
+        monkeypatch.setenv("LLM_CLIENT_SEMANTIC_THRESHOLD", "0.8")
+        assert SemanticCache().threshold == 0.8
+
+
+class TestSemanticCacheThreadSafety:
+    """Tests für den semantischen Cache bei gleichzeitigen Zugriffen."""
+
+    def test_concurrent_add_and_lookup(self):
+        """Test: Suchen während des Einfügens liefern nie einen ungültigen Index."""
+        np = pytest.importorskip("numpy")
+        pytest.importorskip("faiss")
+        cache = SemanticCache(threshold=0.9, encoder=_KeywordEncoder())
+        query = np.array([[1.0, 0.0]], dtype="float32")
+        done = threading.Event()
+
+        def write():
+            # Jeder neue Eintrag ist ähnlicher zur Anfrage als alle vorherigen
+            for i in range(2000):
+                vec = np.array([[1.0, 1.0 / (i + 1)]], dtype="float32")
+                cache.add("ns", vec / np.linalg.norm(vec), f"answer{i}")
+            done.set()
+
+        def read():
+            while not done.is_set():
+                cache.lookup("ns", query)
+
+        # Häufige Thread-Wechsel machen das Zeitfenster zwischen den Schritten sichtbar
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                readers = [executor.submit(read) for _ in range(3)]
+                executor.submit(write).result()
+                for reader in readers:
+                    reader.result()
+        finally:
+            sys.setswitchinterval(interval)
+
+        assert len(cache) == 2000
+
+
+class TestLLMClientHistory:
+    """Tests für das Kürzen langer Verläufe."""
+
+    @staticmethod
+    def _conversation(n_turns):
+        messages = [{"role": "system", "content": "You are helpful."}]
+        for i in range(n_turns):
+            role = "user" if i % 2 == 0 else "assistant"
+            messages.append({"role": role, "content": f"turn {i} " + "x" * 400})
+        return messages
+
+    def test_none_strategy_sends_full_history(self):
+        """Test: Standardmäßig wird der Verlauf unverändert gesendet."""
+        client = LLMClient(api_choice="ollama", max_input_tokens=100)
+        messages = self._conversation(10)
+        assert client._truncate_messages(messages) is messages
+
+    def test_short_history_is_not_truncated(self):
+        """Test: Verläufe innerhalb des Budgets bleiben unverändert."""
+        client = LLMClient(api_choice="ollama", history_strategy="window")
+        messages = self._conversation(2)
+        assert client._truncate_messages(messages) == messages
+
+    def test_window_keeps_system_prompt_and_latest_turns(self):
+        """Test: "window" behält System-Prompt und die neuesten Nachrichten."""
+        client = LLMClient(api_choice="ollama", history_strategy="window", max_input_tokens=350)
+        messages = self._conversation(10)
+
+        truncated = client._truncate_messages(messages)
+
+        assert truncated[0] == messages[0]
+        assert truncated[1:] == messages[-3:]
+        assert sum(map(client._count_message_tokens, truncated)) <= 350
+
+    def test_window_always_keeps_last_message(self):
+        """Test: Die letzte Nachricht bleibt auch bei zu kleinem Budget erhalten."""
+        client = LLMClient(api_choice="ollama", history_strategy="window", max_input_tokens=10)
+        messages = self._conversation(4)
+
+        assert client._truncate_messages(messages) == [messages[0], messages[-1]]
+
+    def test_each_message_is_counted_once(self):
+        """Test: Beim Kürzen wird jede Nachricht nur einmal gezählt."""
+        client = LLMClient(api_choice="ollama", history_strategy="window", max_input_tokens=5000)
+        messages = self._conversation(2000)
+
+        with patch.object(
+            client, "_count_message_tokens", wraps=client._count_message_tokens
+        ) as mock_count:
+            truncated = client._truncate_messages(messages)
+
+        assert mock_count.call_count == len(messages)
+        assert sum(map(client._count_message_tokens, truncated)) <= 5000
+        assert truncated[-1] == messages[-1]
+
+    def test_summarize_replaces_dropped_turns(self):
+        """Test: "summarize" ersetzt verworfene Nachrichten durch eine Zusammenfassung."""
+        client = LLMClient(api_choice="ollama", history_strategy="summarize", max_input_tokens=470)
+        messages = self._conversation(10)
+
+        with patch.object(client, "_create_chat_completion", return_value="Earlier stuff"):
+            truncated = client._truncate_messages(messages)
+
+        assert truncated[0] == messages[0]
+        assert truncated[1] == {
+            "role": "system",
+            "content": "Summary of earlier turns: Earlier stuff",
+        }
+        assert truncated[2:] == messages[-3:]
+
+    def test_truncation_applied_before_api_call(self):
+        """Test: chat_completion sendet den gekürzten Verlauf an die API."""
+        client = LLMClient(api_choice="ollama", history_strategy="window", max_input_tokens=350)
+        messages = self._conversation(10)
+
+        with patch("ollama.chat") as mock_chat:
+            mock_chat.return_value = {"message": {"content": "Response"}}
+            client.chat_completion(messages)
 
-            assert response == "Final response"
-            # Prüfe dass alle Nachrichten übergeben wurden
-            call_args = mock_client.chat.completions.create.call_args
-            assert len(call_args[1]["messages"]) == 4
+        assert mock_chat.call_args[1]["messages"] == [messages[0]] + messages[-3:]
 
-    def test_temperature_bounds(self):
-        """Test: Verschiedene Temperatur-Werte."""
-        # Sehr niedrige Temperatur
-        client = LLMClient(temperature=0.0)
-        assert client.temperature == 0.0
+    def test_invalid_history_strategy_raises_error(self):
+        """Test: Ungültige history_strategy wirft ValueError."""
+        with pytest.raises(ValueError, match="Invalid history_strategy"):
+            LLMClient(api_choice="ollama", history_strategy="invalid")
 
-        # Hohe Temperatur
-        client = LLMClient(temperature=2.0)
-        assert client.temperature == 2.0
 
-        # Standard-Temperatur
-        client = LLMClient()
-        assert client.temperature == 0.7
+class TestLLMClientStableContext:
+    """Tests für die kanonische Anordnung von Kontext-Blöcken."""
+
+    @staticmethod
+    def _rag_messages(chunks, query="What is RAG?"):
+        return (
+            [{"role": "system", "content": "Answer from the context."}]
+            + [{"role": "context", "content": chunk} for chunk in chunks]
+            + [{"role": "user", "content": query}]
+        )
+
+    def test_context_order_does_not_change_prefix(self):
+        """Test: Unterschiedlich sortierte Kontext-Blöcke ergeben denselben Prompt."""
+        client = LLMClient(api_choice="ollama", stable_context=True)
+
+        first = client._canonicalize(self._rag_messages(["chunk A", "chunk B", "chunk C"]))
+        second = client._canonicalize(self._rag_messages(["chunk C", "chunk A", "chunk B"]))
+
+        assert first == second
+
+    def test_context_merged_into_leading_system_message(self):
+        """Test: System-Prompt und Kontext bilden eine führende System-Nachricht."""
+        client = LLMClient(api_choice="ollama", stable_context=True)
+
+        canonical = client._canonicalize(self._rag_messages(["chunk A"]))
+
+        assert canonical == [
+            {"role": "system", "content": "Answer from the context.\n\nchunk A"},
+            {"role": "user", "content": "What is RAG?"},
+        ]
+
+    def test_user_query_placed_last(self):
+        """Test: Nach der Anfrage gesendeter Kontext wird nach vorne verschoben."""
+        client = LLMClient(api_choice="ollama", stable_context=True)
+        messages = [
+            {"role": "user", "content": "What is RAG?"},
+            {"role": "context", "content": "chunk A"},
+        ]
+
+        assert client._canonicalize(messages)[-1] == messages[0]
+
+    def test_disabled_by_default(self):
+        """Test: Ohne stable_context bleiben die Nachrichten unverändert."""
+        client = LLMClient(api_choice="ollama")
+        messages = self._rag_messages(["chunk B", "chunk A"])
+
+        assert client._canonicalize(messages) is messages
+
+    def test_reordered_context_hits_cache(self):
+        """Test: Umsortierte Kontext-Blöcke treffen denselben Cache-Eintrag."""
+        client = LLMClient(api_choice="ollama", temperature=0.0, stable_context=True)
+
+        with patch.object(client, "_create_chat_completion", return_value="Answer") as mock_create:
+            client.chat_completion(self._rag_messages(["chunk A", "chunk B"]))
+            client.chat_completion(self._rag_messages(["chunk B", "chunk A"]))
 
-    def test_extreme_max_tokens(self):
-        """Test: Extreme max_tokens Werte."""
-        # Sehr kleine Werte
-        client = LLMClient(max_tokens=1)
-        assert client.max_tokens == 1
+        mock_create.assert_called_once()
 
-        # Sehr große Werte
-        client = LLMClient(max_tokens=100000)
-        assert client.max_tokens == 100000
+
+class TestLLMClientEdgeCases:
+    """Tests für Edge Cases und spezielle Szenarien."""
+
+    def test_empty_messages_list(self, mocked_openai_client):
+        """Test: Leere Nachrichten-Liste."""
+        client, mock_create = mocked_openai_client
+        mock_create.return_value.choices[0].message.content = "Response"
+
+        assert client.chat_completion([]) == "Response"
+
+    def test_multiple_messages(self, mocked_openai_client):
+        """Test: Mehrere Nachrichten in der Konversation."""
+        client, mock_create = mocked_openai_client
+        mock_create.return_value.choices[0].message.content = "Final response"
+
+        messages = [
+            {"role": "system", "content": "You are helpful"},
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi"},
+            {"role": "user", "content": "How are you?"},
+        ]
+        response = client.chat_completion(messages)
+
+        assert response == "Final response"
+        # Prüfe dass alle Nachrichten übergeben wurden
+        assert len(mock_create.call_args[1]["messages"]) == 4
 
     def test_repr_method(self, monkeypatch):
         """Test: __repr__ gibt korrekte String-Repräsentation zurück."""
@@ -313,6 +1101,7 @@ class TestLLMClientEdgeCases:
         # Sollte auf Ollama zurückfallen
         assert client.api_choice == "ollama"
 
+    @pytest.mark.slow
     def test_google_colab_integration(self, monkeypatch):
         """Test: Google Colab userdata Integration (gemockt)."""
         # Simuliere Colab-Umgebung
@@ -348,6 +1137,15 @@ class TestLLMClientEdgeCases:
         assert client3.api_choice == "ollama"
 
 
+class TestLLMClientPackage:
+    """Tests für die Paketstruktur."""
+
+    def test_llm_client_defined_once(self):
+        """Test: LLMClient stammt aus llm_client/llm_client.py und wird nicht überschattet."""
+        assert inspect.getsourcefile(LLMClient) == inspect.getsourcefile(llm_client)
+        assert inspect.getsourcefile(llm_client).endswith("llm_client/llm_client.py")
+
+
 class TestLLMClientTypeHints:
     """Tests um sicherzustellen, dass Type Hints korrekt sind."""
 
@@ -363,19 +1161,11 @@ class TestLLMClientTypeHints:
         assert all(isinstance(m, dict) for m in valid_messages)
         assert all("role" in m and "content" in m for m in valid_messages)
 
-    def test_return_type_is_string(self, monkeypatch):
+    def test_return_type_is_string(self, mocked_openai_client):
         """Test: chat_completion gibt String zurück."""
-        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
-
-        mock_response = MagicMock()
-        mock_response.choices[0].message.content = "Test response"
+        client, mock_create = mocked_openai_client
+        mock_create.return_value.choices[0].message.content = "Test response"
 
-        with patch("llm_client.llm_client.OpenAI") as mock_openai:
-            mock_client = MagicMock()
-            mock_client.chat.completions.create.return_value = mock_response
-            mock_openai.return_value = mock_client
-
-            client = LLMClient(api_choice="openai")
-            response = client.chat_completion([{"role": "user", "content": "Hi"}])
+        response = client.chat_completion([{"role": "user", "content": "Hi"}])
 
-            assert isinstance(response, str)
+        assert isinstance(response, str)